@@ -0,0 +1,141 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+import tracing
+
+# Month abbreviations in calendar order, used to keep months without uploads in the chart
+ALL_MONTHS = pd.date_range(start='2021-01-01', end='2021-12-31', freq='MS').strftime('%b')
+
+# Number of (channel ID, data version) summaries kept in memory
+MAX_CACHED_AGGREGATES = 32
+
+# Most points sent to the browser for the performance line chart; larger channels are downsampled
+MAX_CHART_POINTS = 2000
+
+# Titles in chart hover labels are cut to this many characters to bound the per-point payload
+MAX_HOVER_TITLE_CHARS = 80
+
+# Everything the dashboard charts need, small enough to keep around between reruns
+DashboardAggregates = namedtuple('DashboardAggregates', [
+    'video_count',           # number of videos the aggregates were computed from
+    'most_recent',           # row of the newest upload
+    'most_popular',          # row of the most viewed upload
+    'top_views',             # top n videos by views
+    'top_likes',             # top n videos by likes
+    'performance',           # Published Date / Views Count / Title / Video ID, oldest first, at most MAX_CHART_POINTS rows
+    'upload_frequency',      # Month / Number of Videos for all 12 months
+    'engagement_by_year',    # Year / Views Count / Likes Count / Comments Count
+])
+
+# Function to pick the indices of at most `threshold` points that keep the visual shape of a line
+# (Largest-Triangle-Three-Buckets). `x` must be sorted. The first, last, highest and lowest points are always kept.
+def lttb_indices(x, y, threshold):
+    n = len(x)
+    if n <= threshold or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # The first and last points are fixed; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third corner of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+
+    return np.unique(np.concatenate([selected, [y.argmax(), y.argmin()]]))
+
+# Function to downsample the views-over-time series to at most max_points rows for the line chart
+def downsample_performance(performance_df, max_points=MAX_CHART_POINTS):
+    if len(performance_df) > max_points:
+        published = performance_df['Published Date'].astype('int64').to_numpy()
+        # Two slots are reserved for the extremes added on top of the LTTB selection
+        indices = lttb_indices(published, performance_df['Views Count'].to_numpy(), max_points - 2)
+        performance_df = performance_df.iloc[indices]
+    return performance_df.assign(Title=performance_df['Title'].str.slice(0, MAX_HOVER_TITLE_CHARS))
+
+# Function to compute all dashboard aggregates from the videos DataFrame.
+# Publish month and year are derived once from the timestamps and shared by both groupings.
+def compute_dashboard_aggregates(videos_df, n=5):
+    published = videos_df['Published Date']
+    top_views = videos_df.nlargest(n, 'Views Count')
+    top_likes = videos_df.nlargest(n, 'Likes Count')
+
+    month_counts = published.dt.month.value_counts()
+    upload_frequency = pd.DataFrame({
+        'Month': ALL_MONTHS,
+        'Number of Videos': [int(month_counts.get(month, 0)) for month in range(1, 13)],
+    })
+
+    engagement = videos_df[['Views Count', 'Likes Count', 'Comments Count']].groupby(published.dt.year.rename('Year')).sum().reset_index()
+
+    performance = downsample_performance(videos_df[['Published Date', 'Views Count', 'Title', 'Video ID']].sort_values('Published Date'))
+
+    return DashboardAggregates(
+        video_count=len(videos_df),
+        most_recent=videos_df.iloc[0],
+        most_popular=top_views.iloc[0],
+        top_views=top_views,
+        top_likes=top_likes,
+        performance=performance,
+        upload_frequency=upload_frequency,
+        engagement_by_year=engagement,
+    )
+
+_aggregates_cache = OrderedDict()
+_aggregates_cache_lock = threading.Lock()
+
+# Function to get the dashboard aggregates memoized by channel ID and data version, so reruns that
+# show the same data skip the recomputation. The caller must change `data_version` whenever the data changes.
+def get_dashboard_aggregates(videos_df, channel_id, data_version):
+    key = (channel_id, data_version)
+    with _aggregates_cache_lock:
+        if key in _aggregates_cache:
+            _aggregates_cache.move_to_end(key)
+            return _aggregates_cache[key]
+
+    with tracing.span('aggregates', rows=len(videos_df)):
+        aggregates = compute_dashboard_aggregates(videos_df)
+
+    with _aggregates_cache_lock:
+        _aggregates_cache[key] = aggregates
+        while len(_aggregates_cache) > MAX_CACHED_AGGREGATES:
+            _aggregates_cache.popitem(last=False)
+    return aggregates
+
+# Function to build a JSON-serializable summary of a channel, used by the batch CLI
+def summarize_channel(overview, videos_df, n=5):
+    aggregates = compute_dashboard_aggregates(videos_df, n)
+    top_views = aggregates.top_views
+    top_likes = aggregates.top_likes
+    return dict(
+        overview,
+        videos_crawled=aggregates.video_count,
+        top_videos_by_views=[
+            {'title': title, 'views': int(views), 'url': url}
+            for title, views, url in zip(top_views['Title'], top_views['Views Count'], top_views['Video URL'])
+        ],
+        top_videos_by_likes=[
+            {'title': title, 'likes': int(likes), 'url': url}
+            for title, likes, url in zip(top_likes['Title'], top_likes['Likes Count'], top_likes['Video URL'])
+        ],
+        upload_frequency_by_month={
+            month: int(count) for month, count in aggregates.upload_frequency.itertuples(index=False)
+        },
+        engagement_by_year=[
+            {'year': int(year), 'views': int(views), 'likes': int(likes), 'comments': int(comments)}
+            for year, views, likes, comments in aggregates.engagement_by_year.itertuples(index=False)
+        ],
+    )
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import snapshot_history
+from aggregations import summarize_channel
+from crawl_state import load_stats_fetched_at
+from http_client import set_pool_size, set_rate_limit
+from youtube_data import extract_channel_name, get_channel_id, get_channel_and_video_data, get_channel_overview
+
+# Headless batch analysis of many channels, without Streamlit.
+# API keys are read from the YOUTUBE_API_KEY / RAPIDAPI_KEY environment variables
+# (or .streamlit/secrets.toml when Streamlit is installed).
+#
+#   python batch_analyze.py channels.txt --output results.jsonl --videos-dir videos/ --workers 8 --rate 20
+#
+# Every run also appends the channels' counts to the snapshot history (snapshot_history.py), so running
+# it daily, e.g. from cron, builds the history behind the growth charts.
+
+# Function to read channel names / links from a file, one per line ('#' starts a comment)
+def read_channel_inputs(path):
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield line
+
+# Function to fetch and summarize one channel; errors are reported in the result instead of raised
+def analyze_channel(channel_input, videos_dir=None, incremental=True, max_workers=4):
+    started_at = time.time()
+    result = {'input': channel_input}
+    try:
+        channel_id = get_channel_id(extract_channel_name(channel_input))
+        channel_details, videos_df = get_channel_and_video_data(channel_id, max_workers=max_workers, incremental=incremental)
+        overview = get_channel_overview(channel_details)
+        result.update(summarize_channel(overview, videos_df))
+        snapshot_history.record_snapshot(channel_id, overview, videos_df, load_stats_fetched_at(channel_id))
+        if videos_dir:
+            videos_df.to_parquet(os.path.join(videos_dir, f'{channel_id}.parquet'), index=False)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['elapsed_seconds'] = round(time.time() - started_at, 3)
+    return result
+
+# Function to analyze channels on a thread pool and stream each result as a JSON line as soon as it finishes.
+# At most `workers` channels are in flight at once, so memory stays bounded regardless of the input size.
+def run_batch(channel_inputs, output, workers=4, videos_dir=None, incremental=True, max_workers=4):
+    succeeded = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        channel_inputs = iter(channel_inputs)
+        while True:
+            for channel_input in channel_inputs:
+                pending.add(executor.submit(analyze_channel, channel_input, videos_dir, incremental, max_workers))
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+                if 'error' in result:
+                    failed += 1
+                else:
+                    succeeded += 1
+    return succeeded, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze many YouTube channels without the Streamlit UI.')
+    parser.add_argument('channels_file', help='file with one channel username or link per line')
+    parser.add_argument('--output', default='-', help='JSONL file for per-channel summaries (default: stdout)')
+    parser.add_argument('--videos-dir', help='directory to write per-channel video tables as Parquet')
+    parser.add_argument('--workers', type=int, default=4, help='number of channels analyzed concurrently')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='concurrent videos lookups per channel')
+    parser.add_argument('--rate', type=float, default=10, help='global cap on API requests per second (0 disables)')
+    parser.add_argument('--full', action='store_true', help='crawl every upload instead of refreshing incrementally')
+    args = parser.parse_args(argv)
+
+    set_rate_limit(args.rate)
+    # Every channel runs its videos lookups and a playlist pager at the same time
+    set_pool_size(max(1, args.workers) * (max(1, args.fetch_workers) + 1))
+    if args.videos_dir:
+        os.makedirs(args.videos_dir, exist_ok=True)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'a')
+    try:
+        succeeded, failed = run_batch(
+            read_channel_inputs(args.channels_file), output, workers=args.workers,
+            videos_dir=args.videos_dir, incremental=not args.full, max_workers=args.fetch_workers
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f'{succeeded} channels analyzed, {failed} failed', file=sys.stderr)
+    return 1 if failed and not succeeded else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Local stand-in for the RapidAPI channel lookup, the YouTube Data API and Gemini, serving synthetic data.
+# A channel's size is encoded in its name: "@bench5000" resolves to channel "UCbench5000" with 5,000 uploads.
+#
+#   python benchmarks/mock_api_server.py --port 8765 --latency-ms 50 --error-rate 0.01
+#
+# Point the app at it with YT_STATS_YOUTUBE_API_URL=http://127.0.0.1:8765/youtube/v3,
+# YT_STATS_RAPIDAPI_URL=http://127.0.0.1:8765/rapidapi and YT_STATS_GEMINI_API_URL=http://127.0.0.1:8765/gemini.
+
+NEWEST_UPLOAD = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+GEMINI_TEXT = """Insights:
+- Uploads are consistent throughout the year.
+- A handful of videos account for most of the views.
+Suggestions:
+- Publish follow-ups to the most viewed videos.
+- Keep the upload cadence steady."""
+
+
+def _channel_size(identifier):
+    match = re.search(r'bench(\d+)$', identifier or '')
+    return int(match.group(1)) if match else None
+
+def _video_id(size, index):
+    return f'b{size}_{index}'
+
+def _stat(video_id, salt, scale):
+    digest = hashlib.blake2b(f'{video_id}:{salt}'.encode(), digest_size=4).digest()
+    return int.from_bytes(digest, 'big') % scale
+
+def channel_response(channel_id):
+    size = _channel_size(channel_id)
+    if size is None:
+        return {'items': []}
+    return {'items': [{
+        'id': channel_id,
+        'snippet': {'title': f'Benchmark channel ({size:,} uploads)', 'publishedAt': '2010-01-01T00:00:00Z'},
+        'statistics': {'subscriberCount': str(size * 100), 'viewCount': str(size * 10000), 'videoCount': str(size)},
+        'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}},
+    }]}
+
+def playlist_items_response(playlist_id, page_token, max_results):
+    size = _channel_size(playlist_id) or 0
+    start = int(page_token or 0)
+    end = min(start + max_results, size)
+    response = {
+        'items': [{'contentDetails': {'videoId': _video_id(size, i)}} for i in range(start, end)],
+        'pageInfo': {'totalResults': size, 'resultsPerPage': max_results},
+    }
+    if end < size:
+        response['nextPageToken'] = str(end)
+    return response
+
+def videos_response(video_ids):
+    items = []
+    for video_id in video_ids:
+        size, index = (int(part) for part in video_id[1:].split('_'))
+        items.append({
+            'id': video_id,
+            'snippet': {
+                'title': f'Benchmark video {index:,} of {size:,}',
+                'publishedAt': (NEWEST_UPLOAD - timedelta(hours=12 * index)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'thumbnails': {'medium': {'url': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg'}},
+            },
+            'statistics': {
+                'viewCount': str(_stat(video_id, 'views', 5_000_000)),
+                'likeCount': str(_stat(video_id, 'likes', 100_000)),
+                'commentCount': str(_stat(video_id, 'comments', 5_000)),
+            },
+            'contentDetails': {'duration': f'PT{_stat(video_id, "minutes", 60)}M{_stat(video_id, "seconds", 60)}S'},
+        })
+    return {'items': items}
+
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=0, error_rate=0.0, error_status=503, seed=None):
+        super().__init__(address, MockApiHandler)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.requests = {}
+            self.errors = 0
+            self.bytes_sent = 0
+
+    def stats(self):
+        with self.stats_lock:
+            return {'requests': dict(self.requests), 'errors': self.errors, 'bytes_sent': self.bytes_sent}
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.stats_lock:
+            self.server.bytes_sent += len(body)
+
+    def _route(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/__stats':
+            return self._send_json(200, self.server.stats())
+        if url.path == '/__reset':
+            self.server.reset_stats()
+            return self._send_json(200, {})
+
+        endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+        with self.server.stats_lock:
+            self.server.requests[endpoint] = self.server.requests.get(endpoint, 0) + 1
+
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        with self.server.stats_lock:
+            fail = self.server.random.random() < self.server.error_rate
+            if fail:
+                self.server.errors += 1
+        if fail:
+            return self._send_json(self.server.error_status, {'error': {'code': self.server.error_status, 'message': 'Injected error', 'errors': [{'reason': 'backendError'}]}})
+
+        if method == 'POST' and url.path.startswith('/gemini/'):
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+            return self._send_json(200, {'candidates': [{'content': {'parts': [{'text': GEMINI_TEXT}]}}]})
+        if url.path.startswith('/rapidapi/'):
+            size = _channel_size(query.get('channelName'))
+            if size is None:
+                return self._send_json(404, {'message': 'Channel not found'})
+            return self._send_json(200, {'data': {'channel': {'id': f'UCbench{size}'}}})
+        if url.path == '/youtube/v3/channels':
+            return self._send_json(200, channel_response(query.get('id')))
+        if url.path == '/youtube/v3/playlistItems':
+            return self._send_json(200, playlist_items_response(query.get('playlistId'), query.get('pageToken'), int(query.get('maxResults', 5))))
+        if url.path == '/youtube/v3/videos':
+            return self._send_json(200, videos_response(query.get('id', '').split(',')))
+        return self._send_json(404, {'error': {'code': 404, 'message': f'Unknown path {url.path}'}})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+
+# Function to start the stand-in on a background thread; port 0 picks a free port
+def start_mock_server(host='127.0.0.1', port=0, latency_ms=0, error_rate=0.0, error_status=503, seed=None):
+    server = MockApiServer((host, port), latency_ms=latency_ms, error_rate=error_rate, error_status=error_status, seed=seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve synthetic RapidAPI / YouTube Data API / Gemini responses.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args(argv)
+
+    server = MockApiServer((args.host, args.port), latency_ms=args.latency_ms, error_rate=args.error_rate, error_status=args.error_status)
+    print(f'Mock API server listening on {server.url}')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
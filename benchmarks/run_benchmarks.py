@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Offline benchmarks of the analyze pipeline against the local API stand-in (mock_api_server.py).
+# Each channel size runs in a fresh subprocess with empty caches, so timings and peak RSS are not
+# polluted by earlier runs.
+#
+#   python benchmarks/run_benchmarks.py --sizes 10,1000,10000 --latency-ms 50 --output bench.json
+#   python benchmarks/run_benchmarks.py --baseline bench.json --max-regression 0.25
+#
+# The second form exits with status 1 if any stage got slower than the baseline by more than 25%.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ['resolve_channel_id', 'channel_details', 'crawl', 'build_videos_df', 'aggregates', 'figures', 'insights']
+
+# Stages shorter than this are too noisy to compare against a baseline, in seconds
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+# Function to run the whole pipeline once for one synthetic channel; runs inside the child process
+def run_pipeline(size, max_workers, with_insights):
+    import http_client
+    from aggregations import compute_dashboard_aggregates
+    from charts import build_dashboard_figures
+    from insights import build_insights_prompt, request_insights
+    from youtube_data import get_channel_id, get_channel_details, get_channel_overview, iter_video_pages, concat_video_pages, build_videos_df
+
+    timings = {}
+
+    def timed(stage, fn, *args, **kwargs):
+        started_at = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[stage] = time.perf_counter() - started_at
+        return result
+
+    started_at = time.perf_counter()
+    channel_id = timed('resolve_channel_id', get_channel_id, f'@bench{size}')
+    channel_details = timed('channel_details', get_channel_details, channel_id)
+
+    crawl_started_at = time.perf_counter()
+    pages = []
+    for page in iter_video_pages(channel_details, max_workers=max_workers):
+        if not pages:
+            timings['first_page'] = time.perf_counter() - crawl_started_at
+        pages.append(page)
+    timings['crawl'] = time.perf_counter() - crawl_started_at
+
+    videos_df = timed('build_videos_df', lambda: build_videos_df(concat_video_pages(pages)))
+    aggregates = timed('aggregates', compute_dashboard_aggregates, videos_df)
+    timed('figures', build_dashboard_figures, aggregates)
+
+    if with_insights:
+        overview = get_channel_overview(channel_details)
+        prompt = build_insights_prompt(
+            overview['channel_title'], overview['subscribers'], overview['total_views'], overview['video_count'], overview['channel_created_on'], aggregates
+        )
+        timed('insights', lambda: request_insights(prompt).result())
+
+    return {
+        'size': size,
+        'videos': len(videos_df),
+        'end_to_end_seconds': time.perf_counter() - started_at,
+        'stages': timings,
+        'quota_units': http_client.quota_ledger.used_today(),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'dataframe_mb': videos_df.memory_usage(deep=True).sum() / (1024 * 1024),
+    }
+
+def _server_call(server_url, path):
+    with urllib.request.urlopen(server_url + path) as response:
+        return json.loads(response.read())
+
+# Function to run one channel size in a child process pointed at the stand-in, with fresh caches
+def run_scenario(server_url, size, max_workers, with_insights, rate):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(
+            os.environ,
+            YT_STATS_YOUTUBE_API_URL=f'{server_url}/youtube/v3',
+            YT_STATS_RAPIDAPI_URL=f'{server_url}/rapidapi',
+            YT_STATS_GEMINI_API_URL=f'{server_url}/gemini',
+            YT_STATS_CACHE_PATH=os.path.join(cache_dir, 'responses.sqlite3'),
+            YT_STATS_CRAWL_STATE_PATH=os.path.join(cache_dir, 'crawl_state.sqlite3'),
+            YT_STATS_QUOTA_PATH=os.path.join(cache_dir, 'quota.sqlite3'),
+            YT_STATS_DAILY_QUOTA=str(10 ** 9),
+            YT_STATS_RATE_LIMIT=str(rate),
+            YOUTUBE_API_KEY='benchmark', RAPIDAPI_KEY='benchmark', GEMINI_API_KEY='benchmark',
+        )
+        command = [sys.executable, os.path.abspath(__file__), '--child', '--sizes', str(size), '--workers', str(max_workers)]
+        if not with_insights:
+            command.append('--no-insights')
+
+        _server_call(server_url, '/__reset')
+        completed = subprocess.run(command, env=env, cwd=cache_dir, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f'Benchmark for {size:,} uploads failed:\n{completed.stderr}')
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        server_stats = _server_call(server_url, '/__stats')
+        result['requests'] = sum(server_stats['requests'].values())
+        result['requests_by_endpoint'] = server_stats['requests']
+        result['injected_errors'] = server_stats['errors']
+        result['bytes_received'] = server_stats['bytes_sent']
+        return result
+
+def print_report(results):
+    header = f"{'uploads':>8} {'e2e s':>8} {'1st page':>8} {'crawl s':>8} {'df s':>7} {'aggr s':>7} {'figs s':>7} {'ai s':>6} {'reqs':>6} {'units':>6} {'errors':>6} {'MB recv':>8} {'RSS MB':>7}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        stages = result['stages']
+        print(
+            f"{result['size']:>8,} {result['end_to_end_seconds']:>8.2f} {stages.get('first_page', 0):>8.2f} {stages['crawl']:>8.2f}"
+            f" {stages['build_videos_df']:>7.3f} {stages['aggregates']:>7.3f} {stages['figures']:>7.3f} {stages.get('insights', 0):>6.2f}"
+            f" {result['requests']:>6,} {result['quota_units']:>6,} {result['injected_errors']:>6,}"
+            f" {result['bytes_received'] / (1024 * 1024):>8.1f} {result['peak_rss_mb']:>7.0f}"
+        )
+
+# Function to compare results against a baseline run; returns a list of human-readable regressions
+def find_regressions(results, baseline, max_regression):
+    baseline_by_size = {result['size']: result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_size.get(result['size'])
+        if previous is None:
+            continue
+        measurements = [('end_to_end_seconds', result['end_to_end_seconds'], previous['end_to_end_seconds'])]
+        measurements += [(stage, result['stages'].get(stage), previous['stages'].get(stage)) for stage in STAGES]
+        for name, current, before in measurements:
+            if current is None or before is None or max(current, before) < MIN_COMPARABLE_SECONDS:
+                continue
+            if current > before * (1 + max_regression):
+                regressions.append(f"{result['size']:,} uploads: {name} took {current:.3f}s, baseline {before:.3f}s")
+        for name in ('requests', 'quota_units'):
+            if result[name] > previous[name]:
+                regressions.append(f"{result['size']:,} uploads: {name} went from {previous[name]:,} to {result[name]:,}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the analyze pipeline against a local API stand-in.')
+    parser.add_argument('--sizes', default='10,1000,10000', help='comma-separated upload counts, e.g. 10,1000,100000')
+    parser.add_argument('--latency-ms', type=float, default=50, help='latency added to every mock API response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of mock API responses that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--workers', type=int, default=8, help='concurrent videos lookups during the crawl')
+    parser.add_argument('--rate', type=float, default=0, help='API requests per second allowed by the client (0, the default, disables the limit)')
+    parser.add_argument('--no-insights', action='store_true', help='skip the Gemini stage')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='allowed slowdown per stage vs the baseline')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    if args.child:
+        print(json.dumps(run_pipeline(sizes[0], args.workers, not args.no_insights)))
+        return 0
+
+    from mock_api_server import start_mock_server
+
+    server = start_mock_server(latency_ms=args.latency_ms, error_rate=args.error_rate, error_status=args.error_status, seed=0)
+    try:
+        results = [run_scenario(server.url, size, args.workers, not args.no_insights, args.rate) for size in sizes]
+    finally:
+        server.shutdown()
+
+    print(f'Mock latency {args.latency_ms:g} ms, error rate {args.error_rate:g}, {args.workers} crawl workers')
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = find_regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print('\nRegressions against the baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print('\nNo regressions against the baseline.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
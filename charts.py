@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.express as px
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+import tracing
+
+# Number of (channel ID, data version) sets of dashboard figures kept in memory
+MAX_CACHED_FIGURES = 32
+
+# Function to build the bar chart of the top videos by a count column, with each bar linking to its video
+def build_top_videos_figure(top_videos_df, column, title, label, color):
+    fig = px.bar(top_videos_df, x='Title', y=column, title=title)
+    fig.update_layout(xaxis_tickangle=-45, height=500)
+    fig.update_traces(marker_color=color, hovertemplate=f'<b>%{{x}}</b><br>{label}: %{{y:,}}<br><a href="%{{customdata[0]}}">Watch Video</a>')
+    fig.update_traces(customdata=top_videos_df[['Video URL']])
+    fig.update_xaxes(title_text='', ticktext=[f'<a href="{url}">{title}</a>' for title, url in zip(top_videos_df['Title'], top_videos_df['Video URL'])], tickvals=top_videos_df['Title'])
+    return fig
+
+# Function to build the views-over-publish-date line chart. The series may be downsampled (see
+# aggregations.downsample_performance); the title then says how many of the channel's videos are drawn.
+# Hover links are built from the video ID so each point only carries its ID and a short title.
+def build_performance_figure(performance_df, video_count):
+    title = 'Video Performance by Time'
+    if len(performance_df) < video_count:
+        title += f' ({len(performance_df):,} of {video_count:,} videos shown)'
+    fig = px.line(performance_df, x='Published Date', y='Views Count', title=title)
+    fig.update_layout(height=600)
+    fig.update_traces(hovertemplate='<b>%{customdata[0]}</b><br>Date: %{x}<br>Views: %{y:,}<br><a href="https://www.youtube.com/watch?v=%{customdata[1]}">Watch Video</a>')
+    fig.update_traces(customdata=performance_df[['Title', 'Video ID']])
+    return fig
+
+# Function to build the uploads-per-month bar chart
+def build_upload_frequency_figure(upload_frequency_df):
+    fig = px.bar(upload_frequency_df, x='Month', y='Number of Videos',
+                 labels={'x': 'Month', 'y': 'Number of Videos'},
+                 title='Video Upload Frequency',
+                 color='Number of Videos',
+                 color_continuous_scale=px.colors.sequential.Plasma)
+    fig.update_layout(height=600)
+    return fig
+
+# Function to build the stacked area chart of views, likes and comments per year
+def build_engagement_figure(grouped_metrics_df):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=grouped_metrics_df['Year'], y=grouped_metrics_df['Views Count'], name='Views', fill='tozeroy', mode='none', stackgroup='one', marker_color='#4CAF50'))
+    fig.add_trace(go.Scatter(x=grouped_metrics_df['Year'], y=grouped_metrics_df['Likes Count'], name='Likes', fill='tonexty', mode='none', stackgroup='one', marker_color='#2196F3'))
+    fig.add_trace(go.Scatter(x=grouped_metrics_df['Year'], y=grouped_metrics_df['Comments Count'], name='Comments', fill='tonexty', mode='none', stackgroup='one', marker_color='#FFC107'))
+
+    # Update layout
+    fig.update_layout(title='Engagement Metrics over Time', xaxis_title='Year', yaxis_title='Count', height=600)
+
+    # Update hover template
+    fig.update_traces(hovertemplate='%{y:,} %{name}<br>Year: %{x}')
+    return fig
+
+# Function to build every dashboard figure from the aggregates
+def build_dashboard_figures(aggregates):
+    return {
+        'views': build_top_videos_figure(aggregates.top_views, 'Views Count', 'Top 5 Videos by Views', 'Views', '#4CAF50'),
+        'likes': build_top_videos_figure(aggregates.top_likes, 'Likes Count', 'Top 5 Liked Videos', 'Likes', '#2196F3'),
+        'performance': build_performance_figure(aggregates.performance, aggregates.video_count),
+        'upload_frequency': build_upload_frequency_figure(aggregates.upload_frequency),
+        'metrics': build_engagement_figure(aggregates.engagement_by_year),
+    }
+
+_figures_cache = OrderedDict()
+_figures_cache_lock = threading.Lock()
+
+# Function to get the dashboard figures memoized by channel ID and data version, the same key as
+# aggregations.get_dashboard_aggregates, so reruns that show the same data skip building them again.
+# The figures are shared between sessions and must not be modified.
+def get_dashboard_figures(aggregates, channel_id, data_version):
+    key = (channel_id, data_version)
+    with _figures_cache_lock:
+        if key in _figures_cache:
+            _figures_cache.move_to_end(key)
+            return _figures_cache[key]
+
+    with tracing.span('figures'):
+        figures = build_dashboard_figures(aggregates)
+
+    with _figures_cache_lock:
+        _figures_cache[key] = figures
+        while len(_figures_cache) > MAX_CACHED_FIGURES:
+            _figures_cache.popitem(last=False)
+    return figures
+
+# Function to build the growth chart from the snapshot history: views gained per day between
+# snapshots as bars, and subscribers as a line on a second axis
+def build_growth_figure(growth_df):
+    fig = make_subplots(specs=[[{'secondary_y': True}]])
+    fig.add_trace(go.Bar(x=growth_df['Snapshot'], y=growth_df['Views Gained per Day'], name='Views Gained per Day', marker_color='#4CAF50',
+                         hovertemplate='%{y:,.0f} views per day<br>%{x}<extra></extra>'))
+    fig.add_trace(go.Scatter(x=growth_df['Snapshot'], y=growth_df['Subscribers'], name='Subscribers', mode='lines+markers', marker_color='#2196F3',
+                             hovertemplate='%{y:,} subscribers<br>%{x}<extra></extra>'), secondary_y=True)
+    fig.update_layout(title='Channel Growth', height=500)
+    fig.update_yaxes(title_text='Views Gained per Day', secondary_y=False)
+    fig.update_yaxes(title_text='Subscribers', secondary_y=True)
+    return fig
+
+# Function to build the comparison charts from the store queries (see comparison.compare_channels)
+def build_comparison_figures(comparison):
+    monthly = comparison.monthly
+    views = px.line(monthly, x='Month', y='Views Count', color='Channel Title', title='Views of Videos Published Each Month')
+    views.update_layout(height=500)
+
+    cadence = px.line(monthly, x='Month', y='Number of Videos', color='Channel Title', title='Upload Cadence', line_shape='hv')
+    cadence.update_layout(height=500)
+
+    engagement_df = comparison.engagement.melt(id_vars='Channel Title', value_vars=['Likes per 1k Views', 'Comments per 1k Views'], var_name='Ratio', value_name='Value')
+    engagement = px.bar(engagement_df, x='Channel Title', y='Value', color='Ratio', barmode='group', title='Engagement Ratios')
+    engagement.update_layout(height=500, xaxis_title='')
+    engagement.update_traces(hovertemplate='<b>%{x}</b><br>%{y:,.1f}')
+    return {'views': views, 'cadence': cadence, 'engagement': engagement}
+
+# Function to build a flame chart of a trace: one bar per span, offset by its start time and stacked by nesting depth
+def build_trace_figure(spans):
+    trace_start_ns = min(span.start_ns for span in spans)
+    depth_by_id = {}
+    for span in spans:
+        depth_by_id[span.span_id] = depth_by_id.get(span.parent_id, -1) + 1
+    fig = go.Figure()
+    for name in dict.fromkeys(span.name for span in spans):
+        named = [span for span in spans if span.name == name]
+        fig.add_trace(go.Bar(
+            name=name,
+            orientation='h',
+            base=[(span.start_ns - trace_start_ns) / 1e6 for span in named],
+            x=[span.duration * 1000 for span in named],
+            y=[depth_by_id[span.span_id] for span in named],
+            customdata=[[span.thread, ', '.join(f'{key}={value}' for key, value in span.attributes.items())] for span in named],
+            hovertemplate=f'<b>{name}</b><br>%{{base:,.0f}} ms + %{{x:,.1f}} ms<br>%{{customdata[0]}}<br>%{{customdata[1]}}<extra></extra>',
+        ))
+    fig.update_layout(barmode='overlay', title='Time by Stage', xaxis_title='Milliseconds since start', height=400)
+    fig.update_yaxes(title_text='Depth', autorange='reversed', dtick=1)
+    return fig
+
+# Function to load the default Plotly template and go through the Plotly Express code paths the dashboard
+# uses once, so the first real figures of a server process are not slowed down by it.
+# Plotly keeps the loaded template for the rest of the process.
+def warm_up_figures():
+    pio.templates[pio.templates.default]
+    sample = {'x': [1, 2], 'y': [1, 2]}
+    px.bar(sample, x='x', y='y', color='y').to_json()
+    px.line(sample, x='x', y='y').to_json()
+    make_subplots(specs=[[{'secondary_y': True}]]).to_json()
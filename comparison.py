@@ -0,0 +1,63 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import snapshot_history
+import tracing
+import video_store
+from crawl_state import load_stats_fetched_at
+from youtube_data import extract_channel_name, get_channel_id, get_channel_and_video_data, get_channel_overview
+
+# A stored snapshot younger than this is compared as is, without contacting the API, in seconds
+SNAPSHOT_MAX_AGE = int(os.environ.get('YT_STATS_SNAPSHOT_MAX_AGE', 15 * 60))
+
+# Channels refreshed at the same time
+MAX_CONCURRENT_CHANNELS = 4
+
+# Results of the comparison queries, small enough to keep in the session between reruns
+ChannelComparison = namedtuple('ChannelComparison', [
+    'channel_ids',    # compared channel IDs, in input order
+    'errors',         # {channel input: error message} for channels that could not be refreshed
+    'monthly',        # channel_id / Channel Title / Month / Views Count / Number of Videos
+    'engagement',     # one row per channel with totals and ratios
+])
+
+# Function to make sure the store holds a recent snapshot of a channel and return its ID.
+# Costs one incremental fetch at most; nothing is fetched while the newest snapshot is younger than max_age.
+def refresh_channel_snapshot(channel_input, max_age=SNAPSHOT_MAX_AGE, max_workers=4):
+    channel_id = get_channel_id(extract_channel_name(channel_input))
+    snapshot_at = video_store.latest_snapshot_at(channel_id)
+    if snapshot_at is not None and time.time() - snapshot_at < max_age:
+        return channel_id
+    with tracing.span('refresh_snapshot', channel_id=channel_id):
+        channel_details, videos_df = get_channel_and_video_data(channel_id, max_workers=max_workers, incremental=True)
+        overview = get_channel_overview(channel_details)
+        video_store.save_snapshot(channel_id, overview, videos_df)
+        snapshot_history.record_snapshot(channel_id, overview, videos_df, load_stats_fetched_at(channel_id))
+    return channel_id
+
+# Function to refresh the channels concurrently, then compute the comparison from the store
+def compare_channels(channel_inputs, max_age=SNAPSHOT_MAX_AGE):
+    errors = {}
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CHANNELS) as executor:
+        futures = [(channel_input, executor.submit(tracing.propagate(refresh_channel_snapshot), channel_input, max_age)) for channel_input in channel_inputs]
+    channel_ids = []
+    for channel_input, future in futures:
+        try:
+            channel_id = future.result()
+        except Exception as e:
+            errors[channel_input] = f'{type(e).__name__}: {e}'
+            continue
+        if channel_id not in channel_ids:
+            channel_ids.append(channel_id)
+
+    if not channel_ids:
+        return ChannelComparison(channel_ids, errors, None, None)
+    with tracing.span('store_query', channels=len(channel_ids)):
+        return ChannelComparison(
+            channel_ids=channel_ids,
+            errors=errors,
+            monthly=video_store.query_monthly_uploads(channel_ids),
+            engagement=video_store.query_engagement(channel_ids),
+        )
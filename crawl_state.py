@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Location of the per-channel crawl snapshots (override with YT_STATS_CRAWL_STATE_PATH)
+CRAWL_STATE_PATH = os.environ.get('YT_STATS_CRAWL_STATE_PATH', os.path.join('.cache', 'crawl_state.sqlite3'))
+
+# Re-fetch statistics of already known videos once the snapshot is older than this, in seconds
+STATS_STALE_AFTER = int(os.environ.get('YT_STATS_STALE_AFTER', 6 * 3600))
+
+_lock = threading.Lock()
+_conn = None
+
+def _connection():
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(CRAWL_STATE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _conn = sqlite3.connect(CRAWL_STATE_PATH, check_same_thread=False)
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_uploads (
+                channel_id TEXT PRIMARY KEY,
+                videos TEXT NOT NULL,
+                crawled_at REAL NOT NULL,
+                stats_fetched_at REAL NOT NULL
+            )
+        """)
+        _conn.commit()
+    return _conn
+
+# Function to load the last crawled snapshot of a channel, or None if it was never crawled.
+# `videos` holds the raw column buffers of the uploads, newest upload first.
+def load_crawl_state(channel_id):
+    with _lock:
+        row = _connection().execute(
+            'SELECT videos, crawled_at, stats_fetched_at FROM channel_uploads WHERE channel_id = ?', (channel_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        'videos': json.loads(row[0]),
+        'crawled_at': row[1],
+        'stats_fetched_at': row[2],
+    }
+
+# Function to get when the statistics in a channel's last crawled snapshot were fetched, or None if it was never crawled
+def load_stats_fetched_at(channel_id):
+    with _lock:
+        row = _connection().execute(
+            'SELECT stats_fetched_at FROM channel_uploads WHERE channel_id = ?', (channel_id,)
+        ).fetchone()
+    return row[0] if row else None
+
+def save_crawl_state(channel_id, videos, stats_fetched_at=None):
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO channel_uploads (channel_id, videos, crawled_at, stats_fetched_at) VALUES (?, ?, ?, ?)',
+            (channel_id, json.dumps(videos, separators=(',', ':')), now, stats_fetched_at or now)
+        )
+        conn.commit()
+
+# Function to decide whether the statistics stored in a snapshot need refreshing
+def stats_are_stale(state, now=None):
+    return (now or time.time()) - state['stats_fetched_at'] > STATS_STALE_AFTER
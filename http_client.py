@@ -0,0 +1,285 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from zoneinfo import ZoneInfo
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+
+# Connect / read timeouts for every external call, in seconds
+TIMEOUT = (5, 30)
+
+# Keep-alive connections per host. Requests beyond it wait for a free connection rather than opening
+# one that would be thrown away, so it should be at least the number of concurrent fetcher threads
+# (compare mode runs 4 channels of 4 fetchers and a pager each); see set_pool_size
+POOL_SIZE = 24
+
+# Default cap on outgoing API requests per second, shared by every thread (override with YT_STATS_RATE_LIMIT, 0 disables)
+RATE_LIMIT = float(os.environ.get('YT_STATS_RATE_LIMIT', 50))
+
+# Retry policy: status codes worth retrying and the jittered exponential backoff schedule
+RETRY_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20
+
+# 403 reasons that are rate limits and clear up after a pause; any other 403 (including RapidAPI and
+# Gemini 403s, which carry no YouTube reason) will not go away by retrying
+RETRYABLE_403_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# 403 reasons meaning the project's YouTube quota is used up for the day
+QUOTA_EXHAUSTED_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+# Daily YouTube Data API quota, in units (the default project quota is 10,000)
+DAILY_QUOTA_UNITS = int(os.environ.get('YT_STATS_DAILY_QUOTA', 10000))
+
+# Location of the quota ledger shared by every process of the app (override with YT_STATS_QUOTA_PATH)
+QUOTA_PATH = os.environ.get('YT_STATS_QUOTA_PATH', os.path.join('.cache', 'quota.sqlite3'))
+
+# A reservation whose crawl has not spent from it for this many seconds is treated as abandoned
+RESERVATION_TTL = 15 * 60
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+# Token bucket shared by every fetcher thread, so concurrent analyses respect one global request rate
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Block until a request may be sent
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Units set aside by QuotaLedger.reserve() for one piece of work; `units` is what is still held
+class QuotaReservation:
+    def __init__(self, reservation_id, units):
+        self.reservation_id = reservation_id
+        self.units = units
+
+
+# Count of YouTube Data API units spent today, and of units reserved by work in progress, shared by every
+# process using the same ledger file (app replicas, restarts and batch runs). The quota resets at midnight
+# Pacific time. Every change runs in a BEGIN IMMEDIATE transaction, so concurrent processes see each other's
+# reservations before they reserve. Reservations not touched for RESERVATION_TTL seconds (e.g. left by a
+# process that was killed) stop counting.
+class QuotaLedger:
+    def __init__(self, daily_limit=DAILY_QUOTA_UNITS, path=None):
+        self.daily_limit = daily_limit
+        self.path = path or QUOTA_PATH
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS quota_days (day TEXT PRIMARY KEY, used INTEGER NOT NULL)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS quota_reservations (id INTEGER PRIMARY KEY AUTOINCREMENT, units INTEGER NOT NULL, expires_at REAL NOT NULL)')
+        return self._conn
+
+    # Run `work(conn, day)` in one transaction; `write` takes the database write lock up front
+    def _transaction(self, work, write=True):
+        day = datetime.now(ZoneInfo('America/Los_Angeles')).date().isoformat()
+        with self._lock:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                result = work(conn, day)
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        return result
+
+    def _counts(self, conn, day):
+        row = conn.execute('SELECT used FROM quota_days WHERE day = ?', (day,)).fetchone()
+        reserved = conn.execute('SELECT COALESCE(SUM(units), 0) FROM quota_reservations WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+        return (row[0] if row else 0), reserved
+
+    def _add_used(self, conn, day, units):
+        conn.execute('INSERT INTO quota_days (day, used) VALUES (?, ?) ON CONFLICT (day) DO UPDATE SET used = used + excluded.used', (day, units))
+
+    def _refused(self, units, remaining):
+        return QuotaExceededError(f'This needs about {units:,} YouTube API units but only {max(remaining, 0):,} of {self.daily_limit:,} are left today')
+
+    # Units spent today
+    def used_today(self):
+        return self._transaction(lambda conn, day: self._counts(conn, day)[0], write=False)
+
+    # Units left today that are not reserved
+    def remaining(self):
+        used, reserved = self._transaction(self._counts, write=False)
+        return self.daily_limit - used - reserved
+
+    # Reserve the units a piece of work is expected to spend, or raise if they are not left, so concurrent
+    # crawls cannot all start on the same remaining quota. Release the reservation when the work ends.
+    def reserve(self, units):
+        def work(conn, day):
+            used, reserved = self._counts(conn, day)
+            if units > self.daily_limit - used - reserved:
+                raise self._refused(units, self.daily_limit - used - reserved)
+            conn.execute('DELETE FROM quota_reservations WHERE expires_at <= ?', (time.time(),))
+            return conn.execute('INSERT INTO quota_reservations (units, expires_at) VALUES (?, ?)', (units, time.time() + RESERVATION_TTL)).lastrowid
+        return QuotaReservation(self._transaction(work), units)
+
+    # Give back the part of a reservation that was not spent
+    def release(self, reservation):
+        self._transaction(lambda conn, day: conn.execute('DELETE FROM quota_reservations WHERE id = ?', (reservation.reservation_id,)))
+        reservation.units = 0
+
+    # Raise if a call of `units` would go over the quota; units still held by `reservation` count as available
+    def ensure_available(self, units, reservation=None):
+        if reservation is not None and units <= reservation.units:
+            return
+        used, reserved = self._transaction(self._counts, write=False)
+        remaining = self.daily_limit - used - reserved
+        if units > remaining + (reservation.units if reservation is not None else 0):
+            raise self._refused(units, remaining)
+
+    # Mark today's quota as used up, after YouTube reported it so; calls are refused until the reset
+    def exhaust(self):
+        def work(conn, day):
+            used = self._counts(conn, day)[0]
+            self._add_used(conn, day, max(0, self.daily_limit - used))
+        self._transaction(work)
+
+    # Record spent units, drawing them from `reservation` while it holds any
+    def spend(self, units, reservation=None):
+        def work(conn, day):
+            self._add_used(conn, day, units)
+            if reservation is not None:
+                drawn = min(units, reservation.units)
+                reservation.units -= drawn
+                conn.execute('UPDATE quota_reservations SET units = ?, expires_at = ? WHERE id = ?', (reservation.units, time.time() + RESERVATION_TTL, reservation.reservation_id))
+        self._transaction(work)
+
+
+quota_ledger = QuotaLedger()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_rate_limiter = None
+
+# Function to get the keep-alive session for a host, creating its connection pool on first use
+def get_session(host):
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=True)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+        return session
+
+# Function to size the per-host connection pools for `size` concurrent requests; existing sessions are closed
+def set_pool_size(size):
+    global POOL_SIZE
+    with _sessions_lock:
+        POOL_SIZE = size
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+# Function to cap the number of outgoing API requests per second (None disables the limit)
+def set_rate_limit(requests_per_second):
+    global _rate_limiter
+    _rate_limiter = RateLimiter(requests_per_second) if requests_per_second else None
+
+set_rate_limit(RATE_LIMIT)
+
+def _error_reasons(response):
+    try:
+        errors = response.json().get('error', {}).get('errors', [])
+    except (ValueError, AttributeError):
+        return set()
+    return {error.get('reason') for error in errors}
+
+def _should_retry(response, reasons):
+    if response.status_code not in RETRY_STATUS_CODES:
+        return False
+    return response.status_code != 403 or bool(reasons & RETRYABLE_403_REASONS)
+
+def _backoff(attempt, response=None):
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(BACKOFF_CAP, int(retry_after))
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+# Function to send an HTTP request through the shared client: pooled session per host, global rate limit,
+# timeouts and jittered exponential backoff on rate-limit 403s, 429/5xx and connection errors.
+# `quota_units` is charged to the quota ledger once per attempt, since YouTube bills failed calls too,
+# and drawn from `quota_reservation` when the call is part of work that reserved its units up front.
+# Every attempt is traced as an "HTTP <method>" span; the query string is left out because it holds API keys.
+def request(method, url, quota_units=0, quota_reservation=None, **kwargs):
+    parts = urlsplit(url)
+    session = get_session(parts.netloc)
+    kwargs.setdefault('timeout', TIMEOUT)
+    for attempt in range(MAX_RETRIES + 1):
+        if quota_units:
+            quota_ledger.ensure_available(quota_units, quota_reservation)
+        if _rate_limiter is not None:
+            _rate_limiter.acquire()
+        with tracing.span(f'HTTP {method}', **{'http.method': method, 'server.address': parts.netloc, 'url.path': parts.path, 'http.attempt': attempt}) as http_span:
+            error = response = None
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                http_span.set(**{'error.type': type(e).__name__})
+                error = e
+            if response is not None:
+                http_span.set(**{
+                    'http.status_code': response.status_code,
+                    'http.response.body.size': len(response.content),
+                    'youtube.quota_units': quota_units,
+                })
+        tracing.inc('yt_stats_http_requests_total', host=parts.netloc, status=response.status_code if error is None else 'error')
+
+        if error is not None:
+            if attempt == MAX_RETRIES:
+                raise error
+            time.sleep(_backoff(attempt))
+            continue
+        tracing.inc('yt_stats_http_response_bytes_total', len(response.content), host=parts.netloc)
+        if quota_units:
+            quota_ledger.spend(quota_units, quota_reservation)
+            tracing.inc('yt_stats_quota_units_total', quota_units)
+        reasons = _error_reasons(response) if response.status_code == 403 else set()
+        if quota_units and reasons & QUOTA_EXHAUSTED_REASONS:
+            quota_ledger.exhaust()
+        if attempt == MAX_RETRIES or not _should_retry(response, reasons):
+            return response
+        time.sleep(_backoff(attempt, response))
+
+def get(url, quota_units=0, quota_reservation=None, **kwargs):
+    return request('GET', url, quota_units=quota_units, quota_reservation=quota_reservation, **kwargs)
+
+def post(url, quota_units=0, quota_reservation=None, **kwargs):
+    return request('POST', url, quota_units=quota_units, quota_reservation=quota_reservation, **kwargs)
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import http_client
+import tracing
+from response_cache import get_cache
+from youtube_data import get_secret
+
+# Base URL of the Gemini API; overridable so the benchmarks can point it at a local stand-in
+GEMINI_API_URL = os.environ.get('YT_STATS_GEMINI_API_URL', 'https://generativelanguage.googleapis.com')
+
+# Number of Gemini calls that may run in the background at once
+MAX_CONCURRENT_INSIGHTS = 4
+
+# Function to build the Gemini prompt from the channel totals and the dashboard aggregates
+def build_insights_prompt(channel_title, subscribers, total_views, video_count, channel_created_on, aggregates):
+    return f"""
+    Act as an Expert of Analyzing Youtube Channels by analyzing different Charts of a Youtube Channel and Analyze the following YouTube channel statistics and provide insights and suggestions for better engagement:
+
+    Channel Name: {channel_title}
+    Subscribers: {subscribers:,}
+    Total Views: {total_views:,}
+    Video Count: {video_count:,}
+    Channel Created On: {channel_created_on}
+
+    Top 5 Videos by Views:
+    {aggregates.top_views[['Title', 'Views Count']].to_string(index=False)}
+
+    Top 5 Liked Videos:
+    {aggregates.top_likes[['Title', 'Likes Count']].to_string(index=False)}
+
+    Video Upload Frequency (last 12 months):
+    {aggregates.upload_frequency.to_string(index=False)}
+
+    Based on this data, provide:
+    1. 3-5 key insights about the channel's performance
+    2. 5-7 actionable suggestions for improving engagement and growing the channel
+
+    Format the output as two separate lists: one for Insights and one for Suggestions. Each list should be prefixed with either "Insights:" or "Suggestions:" respectively.
+    """
+
+def generate_response_with_gemini(prompt):
+    api_key = get_secret("gemini_api_key")
+    api_url = f"{GEMINI_API_URL}/v1beta/models/gemini-pro:generateContent?key={api_key}"
+
+    headers = {
+        'Content-Type': 'application/json'
+    }
+
+    body = {
+        'contents': [
+            {
+                'parts': [
+                    { 'text': prompt }
+                ]
+            }
+        ]
+    }
+
+    response = http_client.post(api_url, headers=headers, json=body)
+    data = response.json()
+
+    if response.status_code == 200:
+        return data['candidates'][0]['content']['parts'][0]['text']
+    else:
+        raise Exception(f"Error generating response from Gemini API: {data}")
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_INSIGHTS)
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+# Function to get the cache key of a prompt; identical inputs produce identical prompts
+def insights_key(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+def _generate_and_cache(key, prompt):
+    try:
+        with tracing.span('insights', prompt_chars=len(prompt)):
+            insights_and_suggestions = generate_response_with_gemini(prompt)
+        get_cache().put('insights', key, insights_and_suggestions)
+        return insights_and_suggestions
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+# Function to start generating insights in the background and return a Future for the text.
+# Cached results (see the 'insights' TTL in response_cache) come back as an already completed Future,
+# and concurrent requests for the same prompt share a single in-flight Gemini call.
+def request_insights(prompt):
+    key = insights_key(prompt)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+
+        cached = get_cache().get('insights', key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        future = _executor.submit(tracing.propagate(_generate_and_cache), key, prompt)
+        _in_flight[key] = future
+        return future
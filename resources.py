@@ -0,0 +1,23 @@
+import streamlit as st
+
+import tracing
+
+# Process-wide resources shared by every session and rerun of the app. They live in this module rather
+# than in streamlit_app.py because the app script is re-executed on every rerun, which would re-create
+# the cached functions (and re-hash their source) each time.
+
+# Function to read a CSS file once per server process
+@st.cache_resource(show_spinner=False)
+def load_css(file_name):
+    with open(file_name, "r") as f:
+        return f.read()
+
+# Startup hook: imports the heavy modules (pandas, numpy, pyarrow, Plotly) and goes through Plotly's first-figure
+# set-up once per server process. The app calls it at the end of the first page load, after the page has
+# already been sent to the browser, so neither the first page nor the first analysis pays for it.
+@st.cache_resource(show_spinner=False)
+def warm_up():
+    with tracing.span('warm_up'):
+        from charts import warm_up_figures
+        warm_up_figures()
+        import aggregations, comparison, insights, snapshot_history, video_store  # noqa: F401
@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Location of the on-disk cache (override with YT_STATS_CACHE_PATH)
+CACHE_PATH = os.environ.get('YT_STATS_CACHE_PATH', os.path.join('.cache', 'responses.sqlite3'))
+
+# Upper bound on the total size of cached payloads, in bytes
+MAX_CACHE_BYTES = int(os.environ.get('YT_STATS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# How long each kind of response stays fresh, in seconds
+TTL_SECONDS = {
+    'channel_id': 30 * 24 * 3600,  # channel name -> channel ID practically never changes
+    'channel': 15 * 60,            # subscriber / view / video counts move quickly
+    'playlist': 15 * 60,           # upload pages shift whenever a new video is published
+    'videos': 6 * 3600,            # per-video statistics
+    'insights': 24 * 3600,         # Gemini insights, keyed by a hash of the prompt
+}
+
+
+# SQLite-backed key/value cache for raw API responses, with per-kind TTLs,
+# least-recently-used eviction once MAX_CACHE_BYTES is exceeded, and hit/miss counters.
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES, ttl_seconds=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = dict(TTL_SECONDS, **(ttl_seconds or {}))
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self._conn.commit()
+
+    # Return the cached value, or None if it is missing or older than its TTL
+    def get(self, kind, key):
+        entry = self.get_entry(kind, key)
+        return entry[0] if entry else None
+
+    # Return the cached value with the time it was stored, or None if it is missing or older than its TTL
+    def get_entry(self, kind, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, stored_at FROM responses WHERE kind = ? AND key = ?', (kind, key)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds[kind]:
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                return None
+            self._conn.execute(
+                'UPDATE responses SET accessed_at = ? WHERE kind = ? AND key = ?', (now, kind, key)
+            )
+            self._conn.commit()
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+        return json.loads(row[0]), row[1]
+
+    def put(self, kind, key, value):
+        payload = json.dumps(value, separators=(',', ':'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (kind, key, value, size, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, key, payload, len(payload), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    # Drop the least recently used entries until the cache fits in max_bytes
+    def _evict(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT rowid, size FROM responses ORDER BY accessed_at')
+        expired = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((rowid,))
+            total -= size
+        self._conn.executemany('DELETE FROM responses WHERE rowid = ?', expired)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def stats(self):
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return {kind: {'hits': self.hits.get(kind, 0), 'misses': self.misses.get(kind, 0)} for kind in kinds}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+# Function to get the process-wide cache instance
+def get_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,248 @@
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: fall back to msvcrt byte-range locks
+    fcntl = None
+    import msvcrt
+
+# Append-only history of channel and per-video statistics, for growth queries.
+#
+#   <HISTORY_PATH>/channels/<channel ID>/video_ids.txt      video dictionary, line number = video index
+#   <HISTORY_PATH>/channels/<channel ID>/head.npz           last recorded counts (a cache of the sum of all snapshots)
+#   <HISTORY_PATH>/channels/<channel ID>/lock               locked by writers (exclusive) and readers (shared)
+#   <HISTORY_PATH>/day=<YYYY-MM-DD>/<channel ID>/<unix seconds>.npz
+#
+# Each snapshot file holds, for the videos whose counts changed, the change in views / likes / comments
+# since the previous snapshot of the channel. Videos seen for the first time carry their full counts and
+# are flagged as new, so they are not mistaken for growth. The sorted video indices are stored as gaps
+# and every array uses the smallest integer dtype that fits, which keeps daily snapshots of large
+# channels to a few kilobytes. Growth over a window is a sum of the snapshot files in its day partitions.
+#
+# The head is written last and commits a snapshot: it holds the snapshot time and one row of counts per
+# dictionary entry. Dictionary lines past its row count and snapshot files newer than its time are left
+# over from a writer that crashed part-way, so readers ignore them and the next writer removes them.
+
+# Location of the history (override with YT_STATS_HISTORY_PATH)
+HISTORY_PATH = os.environ.get('YT_STATS_HISTORY_PATH', os.path.join('.cache', 'history'))
+
+# A channel is recorded at most once per this many seconds; more frequent analyses are not recorded
+MIN_SNAPSHOT_INTERVAL = int(os.environ.get('YT_STATS_HISTORY_MIN_INTERVAL', 3600))
+
+COUNT_COLUMNS = ['Views Count', 'Likes Count', 'Comments Count']
+
+def _channel_dir(channel_id):
+    return os.path.join(HISTORY_PATH, 'channels', channel_id)
+
+# Lock a channel's history against writers in this and other processes (the app and a scheduled batch run).
+# msvcrt has no shared locks, so on Windows readers lock exclusively too.
+@contextmanager
+def _channel_lock(channel_id, exclusive=True):
+    os.makedirs(_channel_dir(channel_id), exist_ok=True)
+    with open(os.path.join(_channel_dir(channel_id), 'lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+            return
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                # LK_LOCK gives up after about 10 seconds of retrying
+                continue
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _day(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+def _smallest_ints(values):
+    return pd.to_numeric(pd.Series(values, dtype='int64'), downcast='integer').to_numpy() if len(values) else np.zeros(0, dtype='int8')
+
+# Function to load the video dictionary of a channel as a list of video IDs, up to the last committed snapshot
+def load_video_ids(channel_id):
+    with _channel_lock(channel_id, exclusive=False):
+        return _load_video_ids(channel_id)[:len(_load_head(channel_id)[1])]
+
+def _load_video_ids(channel_id):
+    try:
+        with open(os.path.join(_channel_dir(channel_id), 'video_ids.txt'), 'r') as f:
+            return f.read().split()
+    except FileNotFoundError:
+        return []
+
+def _load_head(channel_id):
+    try:
+        with np.load(os.path.join(_channel_dir(channel_id), 'head.npz')) as head:
+            return int(head['recorded_at']), head['counts']
+    except FileNotFoundError:
+        return None, np.zeros((0, len(COUNT_COLUMNS)), dtype='int64')
+
+# Function to append a snapshot of a channel's statistics, unless it was recorded less than
+# MIN_SNAPSHOT_INTERVAL seconds ago. `recorded_at` should be when the statistics were fetched from the API
+# (crawl_state.load_stats_fetched_at), so statistics reused from an earlier crawl are not recorded again
+# and growth is divided by the time it actually took. Returns the snapshot time, or None when nothing was recorded.
+def record_snapshot(channel_id, overview, videos_df, recorded_at=None):
+    recorded_at = int(recorded_at or time.time())
+    with _channel_lock(channel_id):
+        previous_at, head_counts = _load_head(channel_id)
+        if previous_at is not None and recorded_at - previous_at < MIN_SNAPSHOT_INTERVAL:
+            return None
+        _remove_uncommitted(channel_id, previous_at or 0, len(head_counts))
+
+        # Extend the video dictionary with uploads seen for the first time
+        known_count = len(head_counts)
+        index_by_id = {video_id: index for index, video_id in enumerate(_load_video_ids(channel_id))}
+        new_ids = [video_id for video_id in videos_df['Video ID'] if video_id not in index_by_id]
+        if new_ids:
+            with open(os.path.join(_channel_dir(channel_id), 'video_ids.txt'), 'a') as f:
+                f.write(''.join(f'{video_id}\n' for video_id in new_ids))
+            index_by_id.update((video_id, known_count + i) for i, video_id in enumerate(new_ids))
+
+        indices = np.fromiter((index_by_id[video_id] for video_id in videos_df['Video ID']), dtype='int64', count=len(videos_df))
+        order = np.argsort(indices)
+        indices = indices[order]
+        counts = videos_df[COUNT_COLUMNS].to_numpy(dtype='int64')[order]
+
+        # Counts of videos that are no longer listed (deleted or made private) stay as they were
+        all_counts = np.zeros((known_count + len(new_ids), len(COUNT_COLUMNS)), dtype='int64')
+        all_counts[:known_count] = head_counts
+        deltas = counts - all_counts[indices]
+        is_new = indices >= known_count
+        changed = is_new | deltas.any(axis=1)
+        all_counts[indices] = counts
+
+        changed_indices = indices[changed]
+        path = os.path.join(HISTORY_PATH, f'day={_day(recorded_at)}', channel_id, f'{recorded_at}.npz')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path + '.tmp.npz',
+            recorded_at=np.int64(recorded_at),
+            previous_at=np.int64(previous_at or 0),
+            channel=np.array([overview['subscribers'], overview['total_views'], overview['video_count']], dtype='int64'),
+            video_gaps=_smallest_ints(np.diff(changed_indices, prepend=0)),
+            new=np.packbits(is_new[changed]),
+            **{column: _smallest_ints(deltas[changed, i]) for i, column in enumerate(['views', 'likes', 'comments'])},
+        )
+        os.replace(path + '.tmp.npz', path)
+        np.savez(os.path.join(_channel_dir(channel_id), 'head.tmp.npz'), recorded_at=np.int64(recorded_at), counts=all_counts)
+        os.replace(os.path.join(_channel_dir(channel_id), 'head.tmp.npz'), os.path.join(_channel_dir(channel_id), 'head.npz'))
+    return recorded_at
+
+# Function to drop what a crashed writer left after the last committed snapshot: dictionary lines past
+# the head's row count and snapshot files newer than the head
+def _remove_uncommitted(channel_id, committed_at, committed_count):
+    if len(_load_video_ids(channel_id)) > committed_count:
+        with open(os.path.join(_channel_dir(channel_id), 'video_ids.txt'), 'r+') as f:
+            video_ids = f.read().split()[:committed_count]
+            f.seek(0)
+            f.write(''.join(f'{video_id}\n' for video_id in video_ids))
+            f.truncate()
+    for day, name in _list_snapshots(channel_id, committed_at):
+        os.remove(os.path.join(HISTORY_PATH, day, channel_id, name))
+
+def _list_snapshots(channel_id, since):
+    try:
+        days = sorted(name for name in os.listdir(HISTORY_PATH) if name.startswith('day=') and name[4:] >= _day(since))
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for day in days:
+        try:
+            names = os.listdir(os.path.join(HISTORY_PATH, day, channel_id))
+        except FileNotFoundError:
+            continue
+        snapshots.extend((day, name) for name in sorted(names) if name.endswith('.npz') and not name.endswith('.tmp.npz') and int(name[:-4]) > since)
+    return snapshots
+
+# Function to read the committed snapshots of a channel recorded after `since` and up to `until` (unix seconds,
+# default the last committed snapshot), oldest first. Only the day partitions in range are listed, and only the
+# requested count arrays are decompressed.
+def iter_snapshots(channel_id, since=0, until=None, counts=('views', 'likes', 'comments')):
+    if until is None:
+        with _channel_lock(channel_id, exclusive=False):
+            until = _load_head(channel_id)[0] or 0
+    for day, name in _list_snapshots(channel_id, since):
+        if int(name[:-4]) > until:
+            continue
+        with np.load(os.path.join(HISTORY_PATH, day, channel_id, name)) as snapshot:
+            indices = np.cumsum(snapshot['video_gaps'], dtype='int64')
+            record = {
+                'recorded_at': int(snapshot['recorded_at']),
+                'previous_at': int(snapshot['previous_at']),
+                'channel': snapshot['channel'],
+                'indices': indices,
+                'new': np.unpackbits(snapshot['new'], count=len(indices)).astype(bool),
+            }
+            for name in counts:
+                record[name] = snapshot[name].astype('int64')
+            yield record
+
+# Function to get one row per snapshot of the channel totals over the last `days` days, with the views
+# its videos gained since the previous snapshot and the average per day over that interval
+def channel_growth(channel_id, days=90, now=None):
+    rows = []
+    for snapshot in iter_snapshots(channel_id, since=(now or time.time()) - days * 86400, counts=('views',)):
+        subscribers, total_views, video_count = (int(value) for value in snapshot['channel'])
+        gained = int(snapshot['views'][~snapshot['new']].sum())
+        elapsed_days = (snapshot['recorded_at'] - snapshot['previous_at']) / 86400 if snapshot['previous_at'] else None
+        rows.append({
+            'Snapshot': pd.Timestamp(snapshot['recorded_at'], unit='s', tz='UTC'),
+            'Subscribers': subscribers,
+            'Total Views': total_views,
+            'Video Count': video_count,
+            'Views Gained': gained if elapsed_days else None,
+            'Views Gained per Day': gained / elapsed_days if elapsed_days else None,
+        })
+    return pd.DataFrame(rows, columns=['Snapshot', 'Subscribers', 'Total Views', 'Video Count', 'Views Gained', 'Views Gained per Day'])
+
+# Function to sum the growth of every video over the last `days` days. Each video's rate is taken over the
+# time it was actually tracked, so uploads first seen inside the window are not diluted.
+# Returns Video ID / Views Gained / Likes Gained / Comments Gained / Views per Day, for videos tracked in the window.
+def video_growth(channel_id, days=7, now=None):
+    now = now or time.time()
+    # The dictionary and the last snapshot are read together; later snapshots may index videos past its end
+    with _channel_lock(channel_id, exclusive=False):
+        committed_at, head_counts = _load_head(channel_id)
+        video_ids = _load_video_ids(channel_id)[:len(head_counts)]
+    gained = np.zeros((len(video_ids), 3), dtype='int64')
+    first_seen_at = np.zeros(len(video_ids))
+    window_start = window_end = None
+    for snapshot in iter_snapshots(channel_id, since=now - days * 86400, until=committed_at or 0):
+        if window_start is None:
+            # The changes in the first snapshot accrued since the snapshot before it
+            window_start = snapshot['previous_at'] or snapshot['recorded_at']
+        window_end = snapshot['recorded_at']
+        new = snapshot['new']
+        grown = snapshot['indices'][~new]
+        for column, name in enumerate(['views', 'likes', 'comments']):
+            gained[grown, column] += snapshot[name][~new]
+        first_seen_at[snapshot['indices'][new]] = snapshot['recorded_at']
+
+    growth = pd.DataFrame({
+        'Video ID': video_ids,
+        'Views Gained': gained[:, 0],
+        'Likes Gained': gained[:, 1],
+        'Comments Gained': gained[:, 2],
+    })
+    if window_end is None:
+        return growth.iloc[:0].assign(**{'Views per Day': pd.Series(dtype='float64')})
+    tracked_days = (window_end - np.maximum(first_seen_at, window_start)) / 86400
+    tracked = tracked_days > 0
+    return growth[tracked].assign(**{'Views per Day': growth['Views Gained'][tracked] / tracked_days[tracked]})
+
+# Function to get the n uploads gaining views fastest over the last `days` days
+def trending_videos(channel_id, days=7, n=10, now=None):
+    return video_growth(channel_id, days, now).nlargest(n, 'Views per Day')
@@ -1,146 +1,248 @@
 import streamlit as st
-import http.client
-import json
-import requests
-import pandas as pd
-from datetime import datetime
-import plotly.graph_objects as go
-import plotly.express as px
-from isodate import parse_duration
-import re
-import dateutil.parser
+import time
+import http_client
+import tracing
+from response_cache import get_cache
+from resources import load_css, warm_up
+
+# Modules that pull in pandas, numpy, pyarrow or Plotly are imported inside the functions that need them,
+# so the page header and inputs render without waiting for them. resources.warm_up() loads them after the first page.
 
 # Custom CSS to improve the look and feel
 def local_css(file_name):
-    with open(file_name, "r") as f:
-        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
-
-# Function to extract channel name from input
-def extract_channel_name(input_string):
-    if input_string.startswith('https://www.youtube.com/'):
-        match = re.search(r'@([\w-]+)', input_string)
-        if match:
-            return '@' + match.group(1)
-    return input_string
-
-# Function to get the channel ID using RapidAPI
-def get_channel_id(channel_name):
-    conn = http.client.HTTPSConnection("youtuber-success-estimator.p.rapidapi.com")
-    headers = {
-        'x-rapidapi-key': st.secrets["rapidapi_key"],
-        'x-rapidapi-host': "youtuber-success-estimator.p.rapidapi.com"
-    }
-    conn.request("GET", f"/api/v0/analytics/creators/estimator?channelName={channel_name}&channelType=youtube", headers=headers)
-    res = conn.getresponse()
-    data = res.read()
-    response_data = json.loads(data.decode("utf-8"))
-    return response_data['data']['channel']['id']
-
-# Function to get the channel details and video data in a single API call
-def get_channel_and_video_data(channel_id):
-    url = f'https://www.googleapis.com/youtube/v3/channels?part=snippet,statistics,contentDetails&id={channel_id}&key={st.secrets["youtube_api_key"]}'
-    response = requests.get(url)
-    channel_data = response.json()
-
-    uploads_playlist_id = channel_data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-
-    videos = []
-    next_page_token = None
-    while True:
-        playlist_url = f'https://www.googleapis.com/youtube/v3/playlistItems?part=snippet,contentDetails&playlistId={uploads_playlist_id}&maxResults=50&key={st.secrets["youtube_api_key"]}'
-        if next_page_token:
-            playlist_url += f'&pageToken={next_page_token}'
-        playlist_response = requests.get(playlist_url)
-        playlist_data = playlist_response.json()
-
-        video_ids = ','.join([item['contentDetails']['videoId'] for item in playlist_data['items']])
-        videos_url = f'https://www.googleapis.com/youtube/v3/videos?part=snippet,statistics,contentDetails&id={video_ids}&key={st.secrets["youtube_api_key"]}'
-        videos_response = requests.get(videos_url)
-        videos_data = videos_response.json()
-
-        for video in videos_data['items']:
-            video_id = video['id']
-            video_title = video['snippet']['title']
-            video_published_at = video['snippet']['publishedAt']
-            view_count = int(video['statistics'].get('viewCount', 0))
-            like_count = int(video['statistics'].get('likeCount', 0))
-            comment_count = int(video['statistics'].get('commentCount', 0))
-            duration = str(parse_duration(video['contentDetails']['duration']))
-            thumbnail_url = video['snippet']['thumbnails']['medium']['url']
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            videos.append([video_title, duration, view_count, like_count, comment_count, video_published_at, thumbnail_url, video_url])
-
-        next_page_token = playlist_data.get('nextPageToken')
-        if not next_page_token:
-            break
-
-    return channel_data, videos
-
-def generate_insights_and_suggestions(channel_title, subscribers, total_views, video_count, channel_created_on, videos_df):
-    prompt = f"""
-    Act as an Expert of Analyzing Youtube Channels by analyzing different Charts of a Youtube Channel and Analyze the following YouTube channel statistics and provide insights and suggestions for better engagement:
-
-    Channel Name: {channel_title}
-    Subscribers: {subscribers:,}
-    Total Views: {total_views:,}
-    Video Count: {video_count:,}
-    Channel Created On: {channel_created_on}
-
-    Top 5 Videos by Views:
-    {videos_df.nlargest(5, 'Views Count')[['Title', 'Views Count']].to_string(index=False)}
-
-    Top 5 Liked Videos:
-    {videos_df.nlargest(5, 'Likes Count')[['Title', 'Likes Count']].to_string(index=False)}
-
-    Video Upload Frequency (last 12 months):
-    {videos_df['Month'].value_counts().sort_index().to_string()}
-
-    Based on this data, provide:
-    1. 3-5 key insights about the channel's performance
-    2. 5-7 actionable suggestions for improving engagement and growing the channel
-
-    Format the output as two separate lists: one for Insights and one for Suggestions. Each list should be prefixed with either "Insights:" or "Suggestions:" respectively.
-    """
-
-    insights_and_suggestions = generate_response_with_gemini(prompt)
-    return insights_and_suggestions
-
-def generate_response_with_gemini(prompt):
-    api_key = st.secrets["gemini_api_key"]
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={api_key}"
-
-    headers = {
-        'Content-Type': 'application/json'
-    }
+    st.markdown(f'<style>{load_css(file_name)}</style>', unsafe_allow_html=True)
+
+# Seconds between in-place chart updates while uploads are still streaming in
+RENDER_INTERVAL = 1.0
+
+# A chart update also waits until the uploads fetched have grown by this factor since the last one. Each
+# update costs time proportional to the uploads so far, so spacing them geometrically keeps the total linear.
+RENDER_GROWTH = 1.5
+
+# Rows of the comprehensive video table sent to the browser at a time
+TABLE_PAGE_SIZE = 500
+
+# Function to render the channel overview cards
+def render_channel_overview(overview):
+    st.markdown("<h2 class='section-header'>Channel Overview</h2>", unsafe_allow_html=True)
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.markdown(f"<div class='metric-box channel-name' style='background-color: #f0f8ff;'><h3>Channel Name</h3><p>{overview['channel_title']}</p></div>", unsafe_allow_html=True)
+    col2.markdown(f"<div class='metric-box subscribers' style='background-color: #f5f5dc;'><h3>Subscribers</h3><p>{overview['subscribers']:,}</p></div>", unsafe_allow_html=True)
+    col3.markdown(f"<div class='metric-box total-views' style='background-color: #ffe4e1;'><h3>Total Views</h3><p>{overview['total_views']:,}</p></div>", unsafe_allow_html=True)
+    col4.markdown(f"<div class='metric-box video-count' style='background-color: #fafad2;'><h3>Video Count</h3><p>{overview['video_count']:,}</p></div>", unsafe_allow_html=True)
+    col5.markdown(f"<div class='metric-box channel-created' style='background-color: #e6e6fa;'><h3>Channel Created On</h3><p>{overview['channel_created_on']}</p></div>", unsafe_allow_html=True)
+
+# Function to render the featured videos and charts from precomputed aggregates and figures; called repeatedly
+# while the uploads stream in, so every chart gets a key unique to this render
+def render_video_charts(aggregates, figures, render_id):
+    # Most Recent and Most Popular Videos
+    st.markdown("<h2 class='section-header'>Featured Videos</h2>", unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+
+    with col1:
+        most_recent = aggregates.most_recent
+        st.markdown("<h3>Most Recent Video</h3>", unsafe_allow_html=True)
+        st.markdown(f"""
+            <div class='video-container' style='width: 100%; height: 0; padding-bottom: 56.25%; position: relative;'>
+                <a href='{most_recent['Video URL']}' target='_blank'>
+                    <img src='{most_recent['Thumbnail URL']}' alt='Most Recent Video Thumbnail' style='position: absolute; width: 100%; height: 100%; object-fit: cover;'>
+                    <div class='play-button' style='position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%);'></div>
+                </a>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"<p><a href='{most_recent['Video URL']}' target='_blank'>{most_recent['Title']}</a></p>", unsafe_allow_html=True)
 
-    body = {
-        'contents': [
-            {
-                'parts': [
-                    { 'text': prompt }
-                ]
-            }
-        ]
-    }
-
-    response = requests.post(api_url, headers=headers, json=body)
-    data = response.json()
+    with col2:
+        most_popular = aggregates.most_popular
+        st.markdown("<h3>Most Popular Video</h3>", unsafe_allow_html=True)
+        st.markdown(f"""
+            <div class='video-container' style='width: 100%; height: 0; padding-bottom: 56.25%; position: relative;'>
+                <a href='{most_popular['Video URL']}' target='_blank'>
+                    <img src='{most_popular['Thumbnail URL']}' alt='Most Popular Video Thumbnail' style='position: absolute; width: 100%; height: 100%; object-fit: cover;'>
+                    <div class='play-button' style='position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%);'></div>
+                </a>
+            </div>
+        """, unsafe_allow_html=True)
+        st.markdown(f"<p><a href='{most_popular['Video URL']}' target='_blank'>{most_popular['Title']}</a></p>", unsafe_allow_html=True)
+
+    # Top 5 Videos by Views and Top 5 Liked Videos
+    st.markdown("<h2 class='section-header'>Top 5 Videos</h2>", unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.plotly_chart(figures['views'], use_container_width=True, key=f'views_{render_id}')
 
-    if response.status_code == 200:
-        return data['candidates'][0]['content']['parts'][0]['text']
-    else:
-        raise Exception(f"Error generating response from Gemini API: {data}")
+    with col2:
+        st.plotly_chart(figures['likes'], use_container_width=True, key=f'likes_{render_id}')
+
+    # Video Performance by Time
+    st.markdown("<h2 class='section-header'>Video Performance by Time</h2>", unsafe_allow_html=True)
+    st.plotly_chart(figures['performance'], use_container_width=True, key=f'performance_{render_id}')
+
+    # Video Upload Frequency Bar Chart
+    st.markdown("<h2 class='section-header'>Video Upload Frequency</h2>", unsafe_allow_html=True)
+    st.plotly_chart(figures['upload_frequency'], use_container_width=True, key=f'upload_frequency_{render_id}')
+
+    # Engagement Metrics over Time
+    st.markdown("<h2 class='section-header'>Engagement Metrics over Time</h2>", unsafe_allow_html=True)
+    st.plotly_chart(figures['metrics'], use_container_width=True, key=f'metrics_{render_id}')
+
+# Function to render the comprehensive video table
+def render_video_table(videos_df):
+    with tracing.span('render_table', rows=len(videos_df)):
+        _render_video_table(videos_df)
+
+def _render_video_table(videos_df):
+    # Comprehensive Video Table
+    st.markdown("<h2 class='section-header'>Comprehensive Video Table</h2>", unsafe_allow_html=True)
+    table_df = videos_df.drop(columns=['Video ID', 'Thumbnail URL', 'Video URL'])
+
+    # The table is sorted and paged here, so only one page of rows is ever sent to the browser
+    page_count = max(1, -(-len(table_df) // TABLE_PAGE_SIZE))
+    if st.session_state.get('video_table_page', 1) > page_count:
+        st.session_state.video_table_page = 1
+    col1, col2, col3 = st.columns([2, 1, 1])
+    sort_column = col1.selectbox("Sort by", table_df.columns, index=list(table_df.columns).index('Published Date'), key='video_table_sort')
+    descending = col2.toggle("Descending", value=True, key='video_table_descending')
+    page = col3.number_input(f"Page (of {page_count:,})", min_value=1, max_value=page_count, step=1, key='video_table_page')
+    first_row = (page - 1) * TABLE_PAGE_SIZE
+    page_df = table_df.sort_values(sort_column, ascending=not descending).iloc[first_row:first_row + TABLE_PAGE_SIZE]
+
+    # Apply CSS styles to the table
+    st.markdown("""
+    <style>
+    .dataframe {
+        width: auto;
+        border-collapse: collapse;
+    }
 
-def main():
-    st.set_page_config(layout="wide", page_title="YouTube Channel Statistics")
+    .dataframe th {
+        background-color: #4CAF50;
+        color: white;
+        padding: 12px;
+        text-align: left;
+    }
 
-    # Load custom CSS
-    local_css("style.css")
+    .dataframe td {
+        border: 1px solid #ddd;
+        padding: 8px;
+    }
 
-    # Page header with logo
-    st.markdown('<div class="logo-container"><img src="https://igtoolsapk.in/wp-content/uploads/2024/07/Youtube-Statistics-Logo-New.png" alt="YouTube Statistics Logo" class="logo"></div>', unsafe_allow_html=True)
-    st.markdown("<h1 class='title' title='Get detailed statistics about your favorite YouTube channels'>YouTube Channel Statistics</h1>", unsafe_allow_html=True)
+    .dataframe tr:nth-child(even) {
+        background-color: #f2f2f2;
+    }
+    </style>
+    """, unsafe_allow_html=True)
 
+    # Display the table
+    st.dataframe(page_df, column_config={'Duration': st.column_config.NumberColumn('Duration (s)')})
+    st.caption(f"Showing videos {first_row + 1:,}–{first_row + len(page_df):,} of {len(videos_df):,}")
+
+# Days of history behind the trending uploads table
+TRENDING_DAYS = 7
+
+# Function to query the channel's snapshot history: growth per snapshot, and the uploads
+# gaining views fastest (with their titles and links from the current videos table)
+def load_growth(channel_id, videos_df):
+    import snapshot_history
+    growth_df = snapshot_history.channel_growth(channel_id)
+    trending_df = snapshot_history.trending_videos(channel_id, days=TRENDING_DAYS)
+    trending_df = trending_df.merge(videos_df[['Video ID', 'Title', 'Video URL']], on='Video ID', how='inner')
+    return growth_df, trending_df
+
+# Function to render the channel growth chart and trending uploads, once there are two snapshots to compare
+def render_growth_section(growth):
+    import snapshot_history
+    from charts import build_growth_figure
+    from crawl_state import STATS_STALE_AFTER
+    growth_df, trending_df = growth
+    st.markdown("<h2 class='section-header'>Channel Growth</h2>", unsafe_allow_html=True)
+    if growth_df['Views Gained'].isna().all():
+        refresh_minutes = max(STATS_STALE_AFTER, snapshot_history.MIN_SNAPSHOT_INTERVAL) // 60
+        st.caption(f"Video statistics are refreshed at most every {refresh_minutes:,} minutes, so growth appears once this channel is analyzed again after that. Run the batch analysis on a schedule to record it daily.")
+        return
+    st.plotly_chart(build_growth_figure(growth_df), use_container_width=True, key='growth')
+    st.markdown(f"<h3>Trending Uploads (last {TRENDING_DAYS} days)</h3>", unsafe_allow_html=True)
+    st.dataframe(
+        trending_df[['Title', 'Views per Day', 'Views Gained', 'Likes Gained', 'Comments Gained', 'Video URL']],
+        hide_index=True,
+        column_config={
+            'Views per Day': st.column_config.NumberColumn(format='%.0f'),
+            'Video URL': st.column_config.LinkColumn('Video', display_text='Watch'),
+        },
+    )
+
+# Function to render the AI generated insights and suggestions side by side
+def render_insights(insights_and_suggestions):
+    # Split insights and suggestions
+    insights, suggestions = insights_and_suggestions.split("Suggestions:")
+    insights = insights.replace("Insights:", "").strip()
+    suggestions = suggestions.strip()
+
+    # Create two columns for insights and suggestions
+    col1, col2 = st.columns(2)
+
+    # Display insights in the first column
+    with col1:
+        st.markdown("<div class='insights-box'><div class='box-title'>Insights</div><ul>", unsafe_allow_html=True)
+        insights_lines = insights.split("\n")
+        for line in insights_lines:
+            st.markdown(f"<li>{line}</li>", unsafe_allow_html=True)
+        st.markdown("</ul></div>", unsafe_allow_html=True)
+
+    # Display suggestions in the second column
+    with col2:
+        st.markdown("<div class='suggestions-box'><div class='box-title'>Suggestions</div><ul>", unsafe_allow_html=True)
+        suggestions_lines = suggestions.split("\n")
+        for line in suggestions_lines:
+            st.markdown(f"<li>{line}</li>", unsafe_allow_html=True)
+        st.markdown("</ul></div>", unsafe_allow_html=True)
+
+# Seconds between checks on a pending insights request
+INSIGHTS_POLL_INTERVAL = 1.0
+
+# Fragment that waits for the background Gemini call without blocking the rest of the page.
+# Once the result is in, the whole app reruns; the rerun renders the result and stops the polling.
+@st.fragment(run_every=INSIGHTS_POLL_INTERVAL)
+def poll_insights(insights_future):
+    if insights_future.done():
+        st.rerun()
+    st.info("Generating insights and suggestions...")
+
+# Function to render the AI insights section, or a placeholder that polls until they are ready
+def render_insights_section(insights_future):
+    st.markdown("<h2 class='section-header'>AI Generated Insights and Suggestions</h2>", unsafe_allow_html=True)
+    if not insights_future.done():
+        poll_insights(insights_future)
+        return
+    try:
+        render_insights(insights_future.result())
+    except Exception as e:
+        st.error(f"Could not generate insights: {str(e)}")
+
+# Function to render the performance panel: flame chart of the analysis trace, per-stage totals and exports.
+# Only shown with ?debug=1 in the URL.
+def render_debug_panel(trace):
+    import json
+    import pandas as pd
+    from charts import build_trace_figure
+    with st.expander("Performance trace", expanded=True):
+        spans = trace.finished_spans()
+        if not spans:
+            st.info("No spans recorded yet.")
+            return
+        st.plotly_chart(build_trace_figure(spans), use_container_width=True, key='trace_flame')
+        totals = pd.DataFrame(
+            [(stage, count, seconds) for stage, (count, seconds) in tracing.stage_totals(trace).items()],
+            columns=['Stage', 'Spans', 'Total (s)'],
+        ).sort_values('Total (s)', ascending=False)
+        st.dataframe(totals, hide_index=True, column_config={'Total (s)': st.column_config.NumberColumn(format='%.3f')})
+        col1, col2 = st.columns(2)
+        col1.download_button("Download trace (OTLP JSON)", json.dumps(tracing.to_otlp_json(trace)), file_name=f'trace-{trace.trace_id}.json', mime='application/json')
+        col2.download_button("Download metrics (Prometheus)", tracing.prometheus_text(), file_name='metrics.prom', mime='text/plain')
+
+# Function to render the single channel analysis: input, live dashboard and insights
+def render_single_channel_mode(debug_mode):
     # Initialize session state for channel input
     if 'channel_input' not in st.session_state:
         st.session_state.channel_input = ''
@@ -161,231 +263,205 @@ def main():
 
     if reset_button:
         st.session_state.channel_input = ''
+        st.session_state.pop('analysis', None)
         st.rerun()
 
     if analyze_button and channel_input:
+        import snapshot_history
+        import video_store
+        from crawl_state import load_stats_fetched_at
+        from aggregations import compute_dashboard_aggregates, get_dashboard_aggregates
+        from charts import build_dashboard_figures, get_dashboard_figures
+        from insights import build_insights_prompt, request_insights
+        from youtube_data import extract_channel_name, get_channel_id, get_channel_details, get_channel_overview, iter_video_pages, concat_video_pages, concat_videos_dfs, build_videos_df
         st.session_state.channel_input = channel_input
+        st.session_state.pop('analysis', None)
         try:
-            with st.spinner("Analyzing channel data..."):
-                # Extract channel name from input
-                channel_name = extract_channel_name(channel_input)
-
-                # Step 1: Get the channel ID using RapidAPI
-                channel_id = get_channel_id(channel_name)
-
-                # Step 2: Use the channel ID to get detailed channel information and video data
-                channel_details, videos_data = get_channel_and_video_data(channel_id)
-
-                channel_title = channel_details['items'][0]['snippet']['title']
-                subscribers = int(channel_details['items'][0]['statistics']['subscriberCount'])
-                total_views = int(channel_details['items'][0]['statistics']['viewCount'])
-                video_count = int(channel_details['items'][0]['statistics']['videoCount'])
-                channel_created_on = None
-                for fmt in ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ'):
-                    try:
-                        channel_created_on = datetime.strptime(channel_details['items'][0]['snippet']['publishedAt'], fmt)
-                        break
-                    except ValueError:
-                        pass
-
-                if channel_created_on is not None:
-                    channel_created_on = channel_created_on.strftime("%B %d, %Y")
-                else:
-                    raise ValueError(f'No valid date format found for {channel_details["items"][0]["snippet"]["publishedAt"]}')
+            # Every analysis is traced; the spans feed the debug panel and the structured logs
+            with tracing.start_trace('analyze') as trace:
+                with st.spinner("Analyzing channel data..."):
+                    # Extract channel name from input
+                    channel_name = extract_channel_name(channel_input)
 
-                # Display Channel Overview
-                st.markdown("<h2 class='section-header'>Channel Overview</h2>", unsafe_allow_html=True)
-                col1, col2, col3, col4, col5 = st.columns(5)
-                col1.markdown(f"<div class='metric-box channel-name' style='background-color: #f0f8ff;'><h3>Channel Name</h3><p>{channel_title}</p></div>", unsafe_allow_html=True)
-                col2.markdown(f"<div class='metric-box subscribers' style='background-color: #f5f5dc;'><h3>Subscribers</h3><p>{subscribers:,}</p></div>", unsafe_allow_html=True)
-                col3.markdown(f"<div class='metric-box total-views' style='background-color: #ffe4e1;'><h3>Total Views</h3><p>{total_views:,}</p></div>", unsafe_allow_html=True)
-                col4.markdown(f"<div class='metric-box video-count' style='background-color: #fafad2;'><h3>Video Count</h3><p>{video_count:,}</p></div>", unsafe_allow_html=True)
-                col5.markdown(f"<div class='metric-box channel-created' style='background-color: #e6e6fa;'><h3>Channel Created On</h3><p>{channel_created_on}</p></div>", unsafe_allow_html=True)
-
-                # Create DataFrame for videos data
-                videos_df = pd.DataFrame(videos_data, columns=['Title', 'Duration', 'Views Count', 'Likes Count', 'Comments Count', 'Published Date', 'Thumbnail URL', 'Video URL'])
-                videos_df['Published Date'] = videos_df['Published Date'].apply(dateutil.parser.parse)
-
-                # Most Recent and Most Popular Videos
-                st.markdown("<h2 class='section-header'>Featured Videos</h2>", unsafe_allow_html=True)
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    most_recent = videos_df.iloc[0]
-                    st.markdown("<h3>Most Recent Video</h3>", unsafe_allow_html=True)
-                    st.markdown(f"""
-                        <div class='video-container' style='width: 100%; height: 0; padding-bottom: 56.25%; position: relative;'>
-                            <a href='{most_recent['Video URL']}' target='_blank'>
-                                <img src='{most_recent['Thumbnail URL']}' alt='Most Recent Video Thumbnail' style='position: absolute; width: 100%; height: 100%; object-fit: cover;'>
-                                <div class='play-button' style='position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%);'></div>
-                            </a>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    st.markdown(f"<p><a href='{most_recent['Video URL']}' target='_blank'>{most_recent['Title']}</a></p>", unsafe_allow_html=True)
-
-                with col2:
-                    most_popular = videos_df.nlargest(1, 'Views Count').iloc[0]
-                    st.markdown("<h3>Most Popular Video</h3>", unsafe_allow_html=True)
-                    st.markdown(f"""
-                        <div class='video-container' style='width: 100%; height: 0; padding-bottom: 56.25%; position: relative;'>
-                            <a href='{most_popular['Video URL']}' target='_blank'>
-                                <img src='{most_popular['Thumbnail URL']}' alt='Most Popular Video Thumbnail' style='position: absolute; width: 100%; height: 100%; object-fit: cover;'>
-                                <div class='play-button' style='position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%);'></div>
-                            </a>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    st.markdown(f"<p><a href='{most_popular['Video URL']}' target='_blank'>{most_popular['Title']}</a></p>", unsafe_allow_html=True)
-
-                # Top 5 Videos by Views and Top 5 Liked Videos
-                st.markdown("<h2 class='section-header'>Top 5 Videos</h2>", unsafe_allow_html=True)
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    top_5_views = videos_df.nlargest(5, 'Views Count')
-                    fig_views = px.bar(top_5_views, x='Title', y='Views Count', title='Top 5 Videos by Views')
-                    fig_views.update_layout(xaxis_tickangle=-45, height=500)
-                    fig_views.update_traces(marker_color='#4CAF50', hovertemplate='<b>%{x}</b><br>Views: %{y:,}<br><a href="%{customdata[0]}">Watch Video</a>')
-                    fig_views.update_traces(customdata=top_5_views[['Video URL']])
-                    fig_views.update_xaxes(title_text='', ticktext=[f'<a href="{url}">{title}</a>' for title, url in zip(top_5_views['Title'], top_5_views['Video URL'])], tickvals=top_5_views['Title'])
-                    st.plotly_chart(fig_views, use_container_width=True)
-
-                with col2:
-                    top_5_likes = videos_df.nlargest(5, 'Likes Count')
-                    fig_likes = px.bar(top_5_likes, x='Title', y='Likes Count', title='Top 5 Liked Videos')
-                    fig_likes.update_layout(xaxis_tickangle=-45, height=500)
-                    fig_likes.update_traces(marker_color='#2196F3', hovertemplate='<b>%{x}</b><br>Likes: %{y:,}<br><a href="%{customdata[0]}">Watch Video</a>')
-                    fig_likes.update_traces(customdata=top_5_likes[['Video URL']])
-                    fig_likes.update_xaxes(title_text='', ticktext=[f'<a href="{url}">{title}</a>' for title, url in zip(top_5_likes['Title'], top_5_likes['Video URL'])], tickvals=top_5_likes['Title'])
-                    st.plotly_chart(fig_likes, use_container_width=True)
-
-                # Video Performance by Time
-                st.markdown("<h2 class='section-header'>Video Performance by Time</h2>", unsafe_allow_html=True)
-                fig_performance = px.line(videos_df.sort_values('Published Date'),
-                                          x='Published Date', y='Views Count',
-                                          hover_data=['Title'],
-                                          title='Video Performance by Time')
-                fig_performance.update_layout(height=600)
-                fig_performance.update_traces(hovertemplate='<b>%{customdata[0]}</b><br>Date: %{x}<br>Views: %{y:,}<br><a href="%{customdata[1]}">Watch Video</a>')
-                fig_performance.update_traces(customdata=videos_df[['Title', 'Video URL']])
-                st.plotly_chart(fig_performance, use_container_width=True)
-
-                # Video Upload Frequency Bar Chart
-                st.markdown("<h2 class='section-header'>Video Upload Frequency</h2>", unsafe_allow_html=True)
-
-                # Create a DataFrame with all 12 months
-                all_months = pd.DataFrame({'Month': pd.date_range(start='2021-01-01', end='2021-12-31', freq='MS').strftime('%b')})
-
-                # Extract the month from 'Published Date' and count the number of videos in each month
-                videos_df['Month'] = videos_df['Published Date'].dt.strftime('%b')
-                video_upload_frequency = videos_df['Month'].value_counts().reset_index()
-                video_upload_frequency.columns = ['Month', 'Number of Videos']
-
-                # Merge the DataFrame with all 12 months with the video upload frequency DataFrame
-                video_upload_frequency = pd.merge(all_months, video_upload_frequency, on='Month', how='left').fillna(0)
-
-                # Create the bar chart
-                fig_upload_frequency = px.bar(video_upload_frequency, x='Month', y='Number of Videos',
-                                              labels={'x': 'Month', 'y': 'Number of Videos'},
-                                              title='Video Upload Frequency',
-                                              color='Number of Videos',
-                                              color_continuous_scale=px.colors.sequential.Plasma)
-                fig_upload_frequency.update_layout(height=600)
-                st.plotly_chart(fig_upload_frequency, use_container_width=True)
-
-                # Engagement Metrics over Time
-                st.markdown("<h2 class='section-header'>Engagement Metrics over Time</h2>", unsafe_allow_html=True)
-                metrics_df = videos_df[['Published Date', 'Views Count', 'Likes Count', 'Comments Count', 'Title', 'Video URL']]
-                metrics_df['Year'] = metrics_df['Published Date'].dt.year
-
-                # Remove the 'Published Date' column from the DataFrame
-                metrics_df = metrics_df.drop(columns=['Published Date'])
-
-                # Group the data by year and calculate the sum of each metric
-                grouped_metrics_df = metrics_df.groupby('Year').sum().reset_index()
-
-                # Create a stacked area chart for each metric
-                fig_metrics = go.Figure()
-                fig_metrics.add_trace(go.Scatter(x=grouped_metrics_df['Year'], y=grouped_metrics_df['Views Count'], name='Views', fill='tozeroy', mode='none', stackgroup='one', marker_color='#4CAF50'))
-                fig_metrics.add_trace(go.Scatter(x=grouped_metrics_df['Year'], y=grouped_metrics_df['Likes Count'], name='Likes', fill='tonexty', mode='none', stackgroup='one', marker_color='#2196F3'))
-                fig_metrics.add_trace(go.Scatter(x=grouped_metrics_df['Year'], y=grouped_metrics_df['Comments Count'], name='Comments', fill='tonexty', mode='none', stackgroup='one', marker_color='#FFC107'))
-
-                # Update layout
-                fig_metrics.update_layout(title='Engagement Metrics over Time', xaxis_title='Year', yaxis_title='Count', height=600)
-
-                # Update hover template
-                fig_metrics.update_traces(hovertemplate='%{y:,} %{name}<br>Year: %{x}')
-
-                # Show the chart
-                st.plotly_chart(fig_metrics, use_container_width=True)
-
-                # Comprehensive Video Table
-                st.markdown("<h2 class='section-header'>Comprehensive Video Table</h2>", unsafe_allow_html=True)
-                table_df = videos_df.drop(columns=['Thumbnail URL', 'Video URL'])
-
-                # Apply CSS styles to the table
-                st.markdown("""
-                <style>
-                .dataframe {
-                    width: auto;
-                    border-collapse: collapse;
-                }
+                    # Step 1: Get the channel ID using RapidAPI
+                    channel_id = get_channel_id(channel_name)
 
-                .dataframe th {
-                    background-color: #4CAF50;
-                    color: white;
-                    padding: 12px;
-                    text-align: left;
-                }
+                    # Step 2: Use the channel ID to get detailed channel information
+                    with tracing.span('channel_details'):
+                        channel_details = get_channel_details(channel_id)
+                        overview = get_channel_overview(channel_details)
 
-                .dataframe td {
-                    border: 1px solid #ddd;
-                    padding: 8px;
+                # Display Channel Overview
+                render_channel_overview(overview)
+                cache_caption = st.empty()
+
+                # Step 3: Stream the uploads, re-rendering the charts in place as pages arrive. Pages are typed once,
+                # in one batch per chart update, and the typed batches are concatenated.
+                # Partial renders are computed and thrown away; only the finished crawl is memoized, under a data
+                # version of its own, so memoized aggregates are never reused across crawls.
+                video_count = overview['video_count']
+                crawl_started_at = time.time()
+                progress_bar = st.progress(0.0, text="Fetching videos...")
+                charts = st.empty()
+                pages = []
+                typed = []
+                page_count = 0
+                fetched = 0
+                render_id = 0
+                last_render = 0.0
+                rendered = 0
+                with tracing.span('crawl') as crawl_span:
+                    for page in iter_video_pages(channel_details, incremental=True):
+                        pages.append(page)
+                        page_count += 1
+                        fetched += len(page['Video ID'])
+                        progress_bar.progress(min(fetched / max(video_count, 1), 1.0), text=f"Fetched {fetched:,} of {video_count:,} videos")
+                        if time.monotonic() - last_render >= RENDER_INTERVAL and fetched >= rendered * RENDER_GROWTH:
+                            render_id += 1
+                            rendered = fetched
+                            typed.append(build_videos_df(concat_video_pages(pages)))
+                            pages = []
+                            with tracing.span('aggregates', rows=fetched):
+                                aggregates = compute_dashboard_aggregates(concat_videos_dfs(typed))
+                            with tracing.span('figures'):
+                                figures = build_dashboard_figures(aggregates)
+                            with tracing.span('render_charts', partial=True), charts.container():
+                                render_video_charts(aggregates, figures, render_id)
+                            last_render = time.monotonic()
+                    crawl_span.set(videos=fetched, pages=page_count)
+                progress_bar.empty()
+
+                if pages:
+                    typed.append(build_videos_df(concat_video_pages(pages)))
+                videos_df = concat_videos_dfs(typed)
+                data_version = (crawl_started_at, len(videos_df))
+                aggregates = get_dashboard_aggregates(videos_df, channel_id, data_version)
+                figures = get_dashboard_figures(aggregates, channel_id, data_version)
+                render_id += 1
+                with tracing.span('render_charts', partial=False), charts.container():
+                    render_video_charts(aggregates, figures, render_id)
+
+                cache_stats = get_cache().stats()
+                cache_hits = sum(counts['hits'] for counts in cache_stats.values())
+                cache_misses = sum(counts['misses'] for counts in cache_stats.values())
+                quota_ledger = http_client.quota_ledger
+                quota_used = quota_ledger.used_today()
+                cache_caption.caption(f"Response cache: {cache_hits:,} hits / {cache_misses:,} misses · YouTube API quota used today: {quota_used:,} / {quota_ledger.daily_limit:,} units")
+
+                render_video_table(videos_df)
+
+                # Keep the video table in the local store, so comparisons can use it without re-crawling,
+                # and add today's counts to the channel's history
+                with tracing.span('store_snapshot'):
+                    video_store.save_snapshot(channel_id, overview, videos_df)
+                    snapshot_history.record_snapshot(channel_id, overview, videos_df, load_stats_fetched_at(channel_id))
+                with tracing.span('growth_queries'):
+                    growth = load_growth(channel_id, videos_df)
+                render_growth_section(growth)
+
+                # Generate insights and suggestions in the background; the section fills in once they are ready.
+                # The insights span is added to this trace when the call finishes.
+                prompt = build_insights_prompt(
+                    overview['channel_title'], overview['subscribers'], overview['total_views'], video_count, overview['channel_created_on'], aggregates
+                )
+                insights_future = request_insights(prompt)
+
+                # Keep the analysis so reruns (any widget interaction) redraw it without fetching or recomputing.
+                # It is stored only once complete, so a failure above leaves no half-built analysis for reruns.
+                st.session_state.analysis = {
+                    'channel_input': channel_input,
+                    'channel_id': channel_id,
+                    'overview': overview,
+                    'videos_df': videos_df,
+                    'data_version': data_version,
+                    'growth': growth,
+                    'trace': trace,
+                    'insights_future': insights_future,
                 }
+            render_insights_section(insights_future)
 
-                .dataframe tr:nth-child(even) {
-                    background-color: #f2f2f2;
-                }
-                </style>
-                """, unsafe_allow_html=True)
-
-                # Display the table
-                st.dataframe(table_df)
-
-                # Generate insights and suggestions
-                st.markdown("<h2 class='section-header'>AI Generated Insights and Suggestions</h2>", unsafe_allow_html=True)
-                with st.spinner("Generating insights and suggestions..."):
-                    insights_and_suggestions = generate_insights_and_suggestions(
-                        channel_title, subscribers, total_views, video_count, channel_created_on, videos_df
-                    )
-                    
-                # Split insights and suggestions
-                insights, suggestions = insights_and_suggestions.split("Suggestions:")
-                insights = insights.replace("Insights:", "").strip()
-                suggestions = suggestions.strip()
-            
-                # Create two columns for insights and suggestions
-                col1, col2 = st.columns(2)
-            
-                # Display insights in the first column
-                with col1:
-                    st.markdown("<div class='insights-box'><div class='box-title'>Insights</div><ul>", unsafe_allow_html=True)
-                    insights_lines = insights.split("\n")
-                    for line in insights_lines:
-                        st.markdown(f"<li>{line}</li>", unsafe_allow_html=True)
-                    st.markdown("</ul></div>", unsafe_allow_html=True)
-            
-                # Display suggestions in the second column
-                with col2:
-                    st.markdown("<div class='suggestions-box'><div class='box-title'>Suggestions</div><ul>", unsafe_allow_html=True)
-                    suggestions_lines = suggestions.split("\n")
-                    for line in suggestions_lines:
-                        st.markdown(f"<li>{line}</li>", unsafe_allow_html=True)
-                    st.markdown("</ul></div>", unsafe_allow_html=True)
+            if debug_mode:
+                render_debug_panel(trace)
 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
             st.error("This could be due to an invalid channel name or API limitations. Please try again with a different channel or later.")
 
+    elif st.session_state.get('analysis') and st.session_state.analysis['channel_input'] == channel_input:
+        from aggregations import get_dashboard_aggregates
+        from charts import get_dashboard_figures
+        analysis = st.session_state.analysis
+        render_channel_overview(analysis['overview'])
+        aggregates = get_dashboard_aggregates(analysis['videos_df'], analysis['channel_id'], analysis['data_version'])
+        render_video_charts(aggregates, get_dashboard_figures(aggregates, analysis['channel_id'], analysis['data_version']), 0)
+        render_video_table(analysis['videos_df'])
+        render_growth_section(analysis['growth'])
+        render_insights_section(analysis['insights_future'])
+        if debug_mode:
+            render_debug_panel(analysis['trace'])
+
+# Function to render the comparison of several channels, computed from the local video store
+def render_comparison(comparison):
+    from charts import build_comparison_figures
+    for channel_input, error in comparison.errors.items():
+        st.warning(f"Could not analyze {channel_input}: {error}")
+    if not comparison.channel_ids:
+        return
+
+    st.markdown("<h2 class='section-header'>Channel Comparison</h2>", unsafe_allow_html=True)
+    st.dataframe(
+        comparison.engagement.drop(columns=['channel_id']),
+        hide_index=True,
+        column_config={
+            'Likes per 1k Views': st.column_config.NumberColumn(format='%.1f'),
+            'Comments per 1k Views': st.column_config.NumberColumn(format='%.1f'),
+            'Average Views per Video': st.column_config.NumberColumn(format='%.0f'),
+            'Views per Subscriber': st.column_config.NumberColumn(format='%.1f'),
+        },
+    )
+
+    figures = build_comparison_figures(comparison)
+    st.plotly_chart(figures['views'], use_container_width=True, key='compare_views')
+    st.plotly_chart(figures['cadence'], use_container_width=True, key='compare_cadence')
+    st.plotly_chart(figures['engagement'], use_container_width=True, key='compare_engagement')
+
+# Function to render the comparison mode. Every channel costs at most one incremental fetch, which also
+# updates the local video store; the charts are then computed by queries against the store.
+def render_comparison_mode(debug_mode):
+    channels_text = st.text_area("YouTube Channels to Compare", key='compare_input', placeholder="One channel username (e.g. @channelname) or link per line")
+    channel_inputs = list(dict.fromkeys(line.strip() for line in channels_text.splitlines() if line.strip()))
+    compare_button = st.button("Compare", key="compare", help="Click to compare the channels")
+
+    if compare_button and channel_inputs:
+        from comparison import compare_channels
+        with tracing.start_trace('compare') as trace, st.spinner(f"Refreshing {len(channel_inputs)} channels..."):
+            st.session_state.comparison = {'channel_inputs': channel_inputs, 'result': compare_channels(channel_inputs), 'trace': trace}
+
+    comparison = st.session_state.get('comparison')
+    if comparison and comparison['channel_inputs'] == channel_inputs:
+        render_comparison(comparison['result'])
+        if debug_mode:
+            render_debug_panel(comparison['trace'])
+
+def main():
+    st.set_page_config(layout="wide", page_title="YouTube Channel Statistics")
+
+    # Load custom CSS
+    local_css("style.css")
+
+    # Page header with logo
+    st.markdown('<div class="logo-container"><img src="https://igtoolsapk.in/wp-content/uploads/2024/07/Youtube-Statistics-Logo-New.png" alt="YouTube Statistics Logo" class="logo"></div>', unsafe_allow_html=True)
+    st.markdown("<h1 class='title' title='Get detailed statistics about your favorite YouTube channels'>YouTube Channel Statistics</h1>", unsafe_allow_html=True)
+
+    # Append ?debug=1 to the URL to show the performance trace of the last analysis
+    debug_mode = st.query_params.get('debug') == '1'
+
+    # Single channel analysis, or several channels side by side
+    if st.toggle("Compare several channels", key='compare_mode'):
+        render_comparison_mode(debug_mode)
+    else:
+        render_single_channel_mode(debug_mode)
+
     # Footer
     st.markdown("""
     <div class="footer">
@@ -393,5 +469,7 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    warm_up()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregations import MAX_CHART_POINTS, downsample_performance, lttb_indices
+
+def performance_df(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Published Date': pd.date_range('2015-01-01', periods=n, freq='h', tz='UTC'),
+        'Views Count': rng.integers(0, 10**6, size=n).astype('uint32'),
+        'Title': [f'Video {i}' for i in range(n)],
+        'Video ID': [f'v{i}' for i in range(n)],
+    })
+
+@pytest.mark.parametrize('n', [1, MAX_CHART_POINTS - 1, MAX_CHART_POINTS, MAX_CHART_POINTS + 1, MAX_CHART_POINTS + 2, MAX_CHART_POINTS + 3, 3000, 20000])
+def test_downsampled_series_fits_the_cap_and_keeps_the_extremes(n):
+    df = performance_df(n)
+    out = downsample_performance(df)
+    assert len(out) <= MAX_CHART_POINTS
+    if n <= MAX_CHART_POINTS:
+        assert len(out) == n
+    views = out['Views Count']
+    assert views.max() == df['Views Count'].max()
+    assert views.min() == df['Views Count'].min()
+    # The first and last uploads are kept, in publish order
+    assert out['Video ID'].iloc[0] == 'v0' and out['Video ID'].iloc[-1] == f'v{n - 1}'
+    assert out['Published Date'].is_monotonic_increasing
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (10, 9), (11, 9), (1000, 50), (2001, 1998)])
+def test_lttb_indices_are_sorted_unique_and_bounded(n, threshold):
+    rng = np.random.default_rng(n)
+    y = rng.normal(size=n)
+    indices = lttb_indices(np.arange(n), y, threshold)
+    assert len(indices) <= threshold + 2
+    assert np.all(np.diff(indices) > 0)
+    assert {0, n - 1, int(y.argmax()), int(y.argmin())} <= set(indices.tolist())
+
+def test_lttb_keeps_spikes_that_are_not_the_extremes():
+    y = np.zeros(1000)
+    y[[120, 503, 877]] = [100, 80, 60]
+    assert {120, 503, 877} <= set(lttb_indices(np.arange(1000), y, 20).tolist())
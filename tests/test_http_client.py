@@ -0,0 +1,86 @@
+import json
+
+import pytest
+import requests
+
+import http_client
+
+URL = 'https://www.googleapis.com/youtube/v3/videos?id=a'
+
+@pytest.fixture(autouse=True)
+def ledger(tmp_path, monkeypatch):
+    ledger = http_client.QuotaLedger(daily_limit=100, path=str(tmp_path / 'quota.sqlite3'))
+    monkeypatch.setattr(http_client, 'quota_ledger', ledger)
+    monkeypatch.setattr(http_client, '_rate_limiter', None)
+    monkeypatch.setattr(http_client, '_backoff', lambda attempt, response=None: 0)
+    return ledger
+
+def response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode()
+    return response
+
+def youtube_error(reason):
+    return {'error': {'code': 403, 'errors': [{'reason': reason}]}}
+
+# Function to make the sessions answer with `responses` in turn; returns the list of status codes sent back
+@pytest.fixture
+def serve(monkeypatch):
+    def serve(*responses):
+        sent = []
+        remaining = list(responses)
+        def request(session, method, url, **kwargs):
+            sent.append(remaining[0].status_code)
+            return remaining.pop(0)
+        monkeypatch.setattr(requests.Session, 'request', request)
+        return sent
+    return serve
+
+def test_a_403_without_a_reason_is_not_retried(serve):
+    # RapidAPI and Gemini 403s carry no YouTube errors[].reason
+    sent = serve(response(403, {'message': 'You are not subscribed to this API.'}), response(200, {}))
+    assert http_client.get('https://yt-api.p.rapidapi.com/channel').status_code == 403
+    assert sent == [403]
+
+def test_a_rate_limit_403_is_retried(serve, ledger):
+    sent = serve(response(403, youtube_error('rateLimitExceeded')), response(200, {'items': []}))
+    assert http_client.get(URL, quota_units=1).status_code == 200
+    assert sent == [403, 200]
+    # YouTube bills the failed attempt too
+    assert ledger.used_today() == 2
+
+def test_quota_exceeded_exhausts_the_ledger(serve, ledger):
+    sent = serve(response(403, youtube_error('quotaExceeded')), response(200, {}))
+    assert http_client.get(URL, quota_units=1).status_code == 403
+    assert sent == [403]
+    assert ledger.remaining() == 0
+    with pytest.raises(http_client.QuotaExceededError):
+        http_client.get(URL, quota_units=1)
+    assert sent == [403]
+
+def test_a_reservation_gives_back_exactly_the_unspent_units(ledger):
+    reservation = ledger.reserve(30)
+    assert ledger.remaining() == 70
+    with pytest.raises(http_client.QuotaExceededError):
+        ledger.reserve(71)
+
+    ledger.spend(12, reservation)
+    assert (ledger.used_today(), ledger.remaining(), reservation.units) == (12, 70, 18)
+    ledger.release(reservation)
+    assert (ledger.used_today(), ledger.remaining()) == (12, 88)
+
+def test_spending_past_a_reservation_draws_on_the_free_quota(ledger):
+    reservation = ledger.reserve(5)
+    ledger.spend(8, reservation)
+    ledger.release(reservation)
+    assert (ledger.used_today(), ledger.remaining()) == (8, 92)
+
+def test_reservations_are_shared_through_the_ledger_file(ledger):
+    # Another process (e.g. a batch run next to the app) opens the same file
+    other = http_client.QuotaLedger(daily_limit=100, path=ledger.path)
+    reservation = ledger.reserve(60)
+    with pytest.raises(http_client.QuotaExceededError):
+        other.reserve(60)
+    ledger.release(reservation)
+    other.reserve(60)
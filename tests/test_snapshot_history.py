@@ -0,0 +1,132 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot_history
+
+OVERVIEW = {'subscribers': 1000, 'total_views': 50000, 'video_count': 3}
+DAY = 86400
+T0 = 1_700_000_000
+
+@pytest.fixture(autouse=True)
+def history_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_history, 'HISTORY_PATH', str(tmp_path))
+
+def videos(rows):
+    return pd.DataFrame(rows, columns=['Video ID', 'Views Count', 'Likes Count', 'Comments Count'])
+
+# Function to rebuild every video's counts by adding up the deltas of all its snapshots
+def replay(channel_id):
+    totals = {}
+    for snapshot in snapshot_history.iter_snapshots(channel_id):
+        for i, index in enumerate(snapshot['indices']):
+            totals[int(index)] = totals.get(int(index), np.zeros(3, dtype='int64')) + [snapshot[name][i] for name in ('views', 'likes', 'comments')]
+    return totals
+
+def test_round_trip_of_deltas_gaps_and_new_flags():
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([
+        ('a', 100, 10, 1),
+        ('b', 3_000_000_000, 20, 2),
+        ('c', 300, 30, 3),
+    ]), recorded_at=T0)
+    # `a` grows, `b` is unchanged, `c` is no longer listed and `d` is a new upload listed first
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([
+        ('d', 50, 5, 0),
+        ('b', 3_000_000_000, 20, 2),
+        ('a', 160, 12, 1),
+    ]), recorded_at=T0 + DAY)
+
+    first, second = snapshot_history.iter_snapshots('UC1')
+    assert first['previous_at'] == 0
+    assert first['indices'].tolist() == [0, 1, 2]
+    assert first['new'].tolist() == [True, True, True]
+    assert first['views'].tolist() == [100, 3_000_000_000, 300]
+
+    assert (second['recorded_at'], second['previous_at']) == (T0 + DAY, T0)
+    assert snapshot_history.load_video_ids('UC1') == ['a', 'b', 'c', 'd']
+    assert second['indices'].tolist() == [0, 3]
+    assert second['new'].tolist() == [False, True]
+    assert second['views'].tolist() == [60, 50]
+    assert second['likes'].tolist() == [2, 5]
+    assert second['comments'].tolist() == [0, 0]
+
+    totals = replay('UC1')
+    assert {index: counts.tolist() for index, counts in totals.items()} == {
+        0: [160, 12, 1], 1: [3_000_000_000, 20, 2], 2: [300, 30, 3], 3: [50, 5, 0],
+    }
+
+def test_round_trip_of_a_large_channel():
+    rng = np.random.default_rng(0)
+    ids = [f'v{i:05d}' for i in range(2000)]
+    counts = rng.integers(0, 10**7, size=(len(ids), 3))
+    for day in range(4):
+        listed = rng.permutation(len(ids))[:1500 + day * 100]
+        grown = rng.random(len(ids)) < 0.3
+        counts[grown] += rng.integers(0, 70000, size=(int(grown.sum()), 3))
+        rows = [(ids[i], *counts[i]) for i in listed]
+        assert snapshot_history.record_snapshot('UC2', OVERVIEW, videos(rows), recorded_at=T0 + day * DAY) == T0 + day * DAY
+
+    # Videos not listed in the last snapshot keep the counts they were last seen with, so only the listed ones are checked
+    last_listed = {row[0] for row in rows}
+    totals = replay('UC2')
+    for index, video_id in enumerate(snapshot_history.load_video_ids('UC2')):
+        if video_id in last_listed:
+            assert totals[index].tolist() == counts[int(video_id[1:])].tolist()
+
+def test_snapshots_closer_than_the_minimum_interval_are_skipped():
+    rows = videos([('a', 100, 10, 1)])
+    assert snapshot_history.record_snapshot('UC1', OVERVIEW, rows, recorded_at=T0) == T0
+    # Statistics reused from the same fetch carry the same time and are not recorded twice
+    assert snapshot_history.record_snapshot('UC1', OVERVIEW, rows, recorded_at=T0) is None
+    assert snapshot_history.record_snapshot('UC1', OVERVIEW, rows, recorded_at=T0 + snapshot_history.MIN_SNAPSHOT_INTERVAL - 1) is None
+    assert len(list(snapshot_history.iter_snapshots('UC1'))) == 1
+
+def test_video_growth_is_measured_over_the_time_each_video_was_tracked():
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('a', 100, 10, 1), ('b', 100, 10, 1)]), recorded_at=T0)
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('a', 300, 10, 1), ('b', 100, 10, 1), ('c', 7, 0, 0)]), recorded_at=T0 + 2 * DAY)
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('a', 400, 11, 1), ('b', 100, 10, 1), ('c', 107, 0, 0)]), recorded_at=T0 + 3 * DAY)
+
+    growth = snapshot_history.video_growth('UC1', days=7, now=T0 + 3 * DAY).set_index('Video ID')
+    assert growth.loc['a', 'Views Gained'] == 300
+    assert growth.loc['a', 'Likes Gained'] == 1
+    assert growth.loc['a', 'Views per Day'] == pytest.approx(100)
+    assert growth.loc['b', 'Views Gained'] == 0
+    # `c` was first seen one day before the end of the window
+    assert growth.loc['c', 'Views Gained'] == 100
+    assert growth.loc['c', 'Views per Day'] == pytest.approx(100)
+
+def test_a_write_interrupted_before_the_head_is_rolled_back(monkeypatch):
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('a', 100, 10, 1)]), recorded_at=T0)
+
+    # Fail after the dictionary and the snapshot file were written, before the head is replaced
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    with monkeypatch.context() as m:
+        m.setattr(snapshot_history.np, 'savez', fail)
+        with pytest.raises(OSError):
+            snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('b', 5000, 0, 0), ('a', 150, 10, 1)]), recorded_at=T0 + DAY)
+
+    assert snapshot_history.load_video_ids('UC1') == ['a']
+    assert [snapshot['recorded_at'] for snapshot in snapshot_history.iter_snapshots('UC1')] == [T0]
+
+    snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('b', 5000, 0, 0), ('a', 150, 10, 1)]), recorded_at=T0 + 2 * DAY)
+    assert snapshot_history.load_video_ids('UC1') == ['a', 'b']
+    first, second = snapshot_history.iter_snapshots('UC1')
+    assert second['indices'].tolist() == [0, 1]
+    assert second['new'].tolist() == [False, True]
+    assert second['views'].tolist() == [50, 5000]
+    # The interrupted snapshot file was removed, not kept next to the one that replaced it
+    assert len(snapshot_history._list_snapshots('UC1', 0)) == 2
+
+def test_history_is_recorded_without_fcntl(monkeypatch):
+    # Windows has no fcntl; the history falls back to msvcrt byte-range locks
+    calls = []
+    fake_msvcrt = types.SimpleNamespace(LK_LOCK=1, LK_UNLCK=0, locking=lambda fd, mode, size: calls.append(mode))
+    monkeypatch.setattr(snapshot_history, 'fcntl', None)
+    monkeypatch.setattr(snapshot_history, 'msvcrt', fake_msvcrt, raising=False)
+
+    assert snapshot_history.record_snapshot('UC1', OVERVIEW, videos([('a', 100, 10, 1)]), recorded_at=T0) == T0
+    assert snapshot_history.load_video_ids('UC1') == ['a']
+    assert calls == [1, 0, 1, 0]
@@ -0,0 +1,45 @@
+import pytest
+
+from youtube_data import RAW_VIDEO_COLUMNS, build_videos_df, concat_video_pages
+
+def raw_page(video_ids, durations=None, views=None):
+    n = len(video_ids)
+    return {
+        'Video ID': list(video_ids),
+        'Title': [f'Title {video_id}' for video_id in video_ids],
+        'Duration': durations or ['PT1M'] * n,
+        'Views Count': views or ['10'] * n,
+        'Likes Count': ['1'] * n,
+        'Comments Count': ['0'] * n,
+        'Published Date': ['2024-03-01T12:00:00Z'] * n,
+        'Thumbnail URL': ['https://i.ytimg.com/x.jpg'] * n,
+    }
+
+@pytest.mark.parametrize('duration, seconds', [
+    ('P0D', 0),
+    ('PT45S', 45),
+    ('PT1H2M3S', 3723),
+    ('P1DT2H', 93600),
+    ('PT10M', 600),
+])
+def test_durations_are_parsed_to_seconds(duration, seconds):
+    videos_df = build_videos_df(raw_page(['a'], durations=[duration]))
+    assert videos_df['Duration'].tolist() == [seconds]
+    assert videos_df['Duration'].dtype == 'uint32'
+
+def test_counts_are_downcast_and_urls_built():
+    videos_df = build_videos_df(raw_page(['a', 'b'], views=['5', '4000000000']))
+    assert videos_df['Views Count'].tolist() == [5, 4000000000]
+    assert videos_df['Views Count'].dtype == 'uint32'
+    assert videos_df['Likes Count'].dtype == 'uint8'
+    assert videos_df['Video URL'].tolist() == ['https://www.youtube.com/watch?v=a', 'https://www.youtube.com/watch?v=b']
+    assert str(videos_df['Published Date'].dt.tz) == 'UTC'
+
+def test_concatenated_pages_keep_the_first_occurrence_of_a_video():
+    first = raw_page(['a', 'b'], views=['1', '2'])
+    # The playlist shifted while it was paged, so `b` comes back on the next page
+    second = dict(raw_page(['b', 'c'], views=['3', '4']), fetched_at=0.0)
+    raw = concat_video_pages([first, second])
+    assert set(raw) == set(RAW_VIDEO_COLUMNS)
+    assert raw['Video ID'] == ['a', 'b', 'c']
+    assert raw['Views Count'] == ['1', '2', '4']
@@ -0,0 +1,195 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight tracing for the analyze pipeline. Spans nest through a context variable; work handed to
+# thread pools must be wrapped with `propagate` so its spans keep their parent. Finished spans are
+# logged as JSON on the "youtube_stats.trace" logger, can be exported as OTLP/JSON, and feed the
+# Prometheus-style counters returned by `prometheus_text`.
+
+logger = logging.getLogger('youtube_stats.trace')
+
+SERVICE_NAME = 'youtube-stats'
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _new_id(n_bytes):
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_seconds': round(self.duration, 6),
+            'thread': self.thread,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+# All finished spans of one analysis run
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = _new_id(16)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def finished_spans(self):
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span.start_ns)
+
+
+# Prometheus-style counters, process wide: {(metric name, sorted label items): value}
+_counters = {}
+_counters_lock = threading.Lock()
+
+METRIC_HELP = {
+    'yt_stats_stage_seconds_total': 'Total time spent in each pipeline stage, in seconds.',
+    'yt_stats_stage_runs_total': 'Number of times each pipeline stage ran.',
+    'yt_stats_http_requests_total': 'HTTP requests sent to external APIs.',
+    'yt_stats_http_response_bytes_total': 'Bytes received from external APIs.',
+    'yt_stats_quota_units_total': 'YouTube Data API quota units spent.',
+}
+
+# Function to add to a counter
+def inc(metric, value=1, **labels):
+    key = (metric, tuple(sorted(labels.items())))
+    with _counters_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Function to render all counters in the Prometheus text exposition format
+def prometheus_text():
+    with _counters_lock:
+        counters = dict(_counters)
+    lines = []
+    for metric in sorted({metric for metric, _ in counters}):
+        lines.append(f'# HELP {metric} {METRIC_HELP.get(metric, metric)}')
+        lines.append(f'# TYPE {metric} counter')
+        for (name, labels), value in sorted(counters.items()):
+            if name != metric:
+                continue
+            label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels)
+            lines.append(f'{metric}{{{label_text}}} {value:g}' if label_text else f'{metric} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+# Context manager that makes a new trace current for everything run inside it
+@contextmanager
+def start_trace(name):
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+# Context manager that times a block as a span of the current trace.
+# Without an active trace the block is still timed into the stage counters, just not recorded.
+@contextmanager
+def span(name, **attributes):
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    current = Span(name, trace.trace_id if trace else None, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        inc('yt_stats_stage_seconds_total', current.duration, stage=name)
+        inc('yt_stats_stage_runs_total', stage=name)
+        if trace is not None:
+            trace.add(current)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps(current.to_dict()))
+
+# Function to get the current span, or None outside of any span
+def current_span():
+    return _current_span.get()
+
+# Function to wrap a callable so it runs in the caller's trace context, e.g. on a thread pool
+def propagate(fn):
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+# Function to export a trace as OpenTelemetry OTLP/JSON (the body of a POST to /v1/traces)
+def to_otlp_json(trace):
+    spans = []
+    for finished in trace.finished_spans():
+        otlp_span = {
+            'traceId': finished.trace_id,
+            'spanId': finished.span_id,
+            'name': finished.name,
+            'kind': 3 if finished.name.startswith('HTTP ') else 1,
+            'startTimeUnixNano': str(finished.start_ns),
+            'endTimeUnixNano': str(finished.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in finished.attributes.items()],
+            'status': {'code': 2, 'message': finished.error} if finished.error else {'code': 1},
+        }
+        if finished.parent_id:
+            otlp_span['parentSpanId'] = finished.parent_id
+        spans.append(otlp_span)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+        'scopeSpans': [{'scope': {'name': 'youtube_stats.tracing'}, 'spans': spans}],
+    }]}
+
+# Function to sum span durations by name, e.g. for a per-stage breakdown; nested spans count towards both
+def stage_totals(trace):
+    totals = {}
+    for finished in trace.finished_spans():
+        count, seconds = totals.get(finished.name, (0, 0.0))
+        totals[finished.name] = (count + 1, seconds + finished.duration)
+    return totals
@@ -0,0 +1,123 @@
+import os
+import shutil
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Local columnar store of per-channel video tables, one Parquet file per snapshot, laid out as
+#
+#   <STORE_PATH>/channel_id=<channel ID>/snapshot_at=<unix seconds>/videos.parquet
+#
+# Comparisons read only the newest snapshot of each channel and only the columns they need.
+
+# Location of the store (override with YT_STATS_STORE_PATH)
+STORE_PATH = os.environ.get('YT_STATS_STORE_PATH', os.path.join('.cache', 'video_store'))
+
+# Snapshots kept per channel; older ones are deleted when a new one is written
+KEEP_SNAPSHOTS = int(os.environ.get('YT_STATS_STORE_KEEP_SNAPSHOTS', 3))
+
+SNAPSHOT_FILE = 'videos.parquet'
+
+# Fixed schema, so snapshots written from differently downcast DataFrames can be read as one dataset
+SNAPSHOT_SCHEMA = pa.schema([
+    ('Video ID', pa.string()),
+    ('Title', pa.string()),
+    ('Duration', pa.uint32()),
+    ('Views Count', pa.uint64()),
+    ('Likes Count', pa.uint64()),
+    ('Comments Count', pa.uint64()),
+    ('Published Date', pa.timestamp('us', tz='UTC')),
+    ('Channel Title', pa.string()),
+    ('Subscribers', pa.uint64()),
+])
+
+_write_lock = threading.Lock()
+
+def _channel_dir(channel_id):
+    return os.path.join(STORE_PATH, f'channel_id={channel_id}')
+
+# Function to list the snapshot times of a channel, oldest first
+def list_snapshots(channel_id):
+    try:
+        names = os.listdir(_channel_dir(channel_id))
+    except FileNotFoundError:
+        return []
+    snapshots = []
+    for name in names:
+        if name.startswith('snapshot_at=') and os.path.exists(os.path.join(_channel_dir(channel_id), name, SNAPSHOT_FILE)):
+            snapshots.append(int(name.split('=', 1)[1]))
+    return sorted(snapshots)
+
+# Function to get the time of the newest snapshot of a channel, or None if it has none
+def latest_snapshot_at(channel_id):
+    snapshots = list_snapshots(channel_id)
+    return snapshots[-1] if snapshots else None
+
+def _snapshot_path(channel_id, snapshot_at):
+    return os.path.join(_channel_dir(channel_id), f'snapshot_at={snapshot_at}', SNAPSHOT_FILE)
+
+# Function to write the videos DataFrame of a channel as a new snapshot and prune the oldest ones.
+# The file is written under a temporary name and renamed, so readers never see a partial snapshot.
+def save_snapshot(channel_id, overview, videos_df, snapshot_at=None):
+    snapshot_at = int(snapshot_at or time.time())
+    table = pa.Table.from_pandas(
+        videos_df[['Video ID', 'Title', 'Duration', 'Views Count', 'Likes Count', 'Comments Count', 'Published Date']].assign(**{
+            'Channel Title': overview['channel_title'],
+            'Subscribers': overview['subscribers'],
+        }),
+        schema=SNAPSHOT_SCHEMA, preserve_index=False, safe=False,
+    )
+    path = _snapshot_path(channel_id, snapshot_at)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path + '.tmp', compression='zstd')
+    os.replace(path + '.tmp', path)
+
+    with _write_lock:
+        for old_snapshot_at in list_snapshots(channel_id)[:-KEEP_SNAPSHOTS]:
+            shutil.rmtree(os.path.dirname(_snapshot_path(channel_id, old_snapshot_at)), ignore_errors=True)
+    return snapshot_at
+
+# Function to read the newest snapshot of each channel as one Arrow table, with `channel_id` and
+# `snapshot_at` columns from the partition directories. Channels without a snapshot are left out.
+def read_latest(channel_ids, columns=None):
+    paths = []
+    for channel_id in channel_ids:
+        snapshot_at = latest_snapshot_at(channel_id)
+        if snapshot_at is not None:
+            paths.append(_snapshot_path(channel_id, snapshot_at))
+    dataset = ds.dataset(paths, schema=SNAPSHOT_SCHEMA.append(pa.field('channel_id', pa.string())).append(pa.field('snapshot_at', pa.int64())),
+                         format='parquet', partitioning='hive', partition_base_dir=STORE_PATH)
+    return dataset.to_table(columns=columns)
+
+# Function to count uploads and sum their views by publish month, per channel
+def query_monthly_uploads(channel_ids):
+    table = read_latest(channel_ids, columns=['channel_id', 'Channel Title', 'Published Date', 'Views Count'])
+    table = table.append_column('Month', pc.floor_temporal(table['Published Date'], unit='month'))
+    monthly = table.group_by(['channel_id', 'Channel Title', 'Month']).aggregate([
+        ('Views Count', 'sum'),
+        ('Views Count', 'count'),
+    ])
+    monthly = monthly.rename_columns(['channel_id', 'Channel Title', 'Month', 'Views Count', 'Number of Videos'])
+    return monthly.sort_by([('channel_id', 'ascending'), ('Month', 'ascending')]).to_pandas()
+
+# Function to compute per-channel engagement totals and ratios (one row per channel)
+def query_engagement(channel_ids):
+    table = read_latest(channel_ids, columns=['channel_id', 'Channel Title', 'Subscribers', 'Views Count', 'Likes Count', 'Comments Count'])
+    totals = table.group_by(['channel_id', 'Channel Title']).aggregate([
+        ('Subscribers', 'max'),
+        ('Views Count', 'count'),
+        ('Views Count', 'sum'),
+        ('Likes Count', 'sum'),
+        ('Comments Count', 'sum'),
+    ])
+    engagement = totals.rename_columns(['channel_id', 'Channel Title', 'Subscribers', 'Number of Videos', 'Views Count', 'Likes Count', 'Comments Count']).to_pandas()
+    views = engagement['Views Count'].astype('float64').clip(lower=1)
+    engagement['Likes per 1k Views'] = engagement['Likes Count'] / views * 1000
+    engagement['Comments per 1k Views'] = engagement['Comments Count'] / views * 1000
+    engagement['Average Views per Video'] = views / engagement['Number of Videos'].clip(lower=1)
+    engagement['Views per Subscriber'] = views / engagement['Subscribers'].astype('float64').clip(lower=1)
+    return engagement
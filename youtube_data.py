@@ -0,0 +1,268 @@
+import math
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import chain, compress
+
+import pandas as pd
+
+import http_client
+import tracing
+from response_cache import get_cache
+from crawl_state import load_crawl_state, save_crawl_state, stats_are_stale
+
+# Base URLs of the external APIs; overridable so the benchmarks can point the fetchers at a local stand-in
+YOUTUBE_API_URL = os.environ.get('YT_STATS_YOUTUBE_API_URL', 'https://www.googleapis.com/youtube/v3')
+RAPIDAPI_URL = os.environ.get('YT_STATS_RAPIDAPI_URL', 'https://youtuber-success-estimator.p.rapidapi.com')
+
+# Function to look up an API key: environment variables (e.g. YOUTUBE_API_KEY) take precedence,
+# so the fetchers also work outside of Streamlit; otherwise fall back to Streamlit secrets
+def get_secret(name):
+    value = os.environ.get(name.upper())
+    if value:
+        return value
+    import streamlit as st
+    return st.secrets[name]
+
+# Function to extract channel name from input
+def extract_channel_name(input_string):
+    if input_string.startswith('https://www.youtube.com/'):
+        match = re.search(r'@([\w-]+)', input_string)
+        if match:
+            return '@' + match.group(1)
+    return input_string
+
+# Function to get the channel ID using RapidAPI
+def get_channel_id(channel_name):
+    with tracing.span('resolve_channel_id') as resolve_span:
+        return _get_channel_id(channel_name, resolve_span)
+
+def _get_channel_id(channel_name, resolve_span):
+    cache = get_cache()
+    channel_id = cache.get('channel_id', channel_name.lower())
+    resolve_span.set(cache_hit=channel_id is not None)
+    if channel_id is not None:
+        return channel_id
+
+    headers = {
+        'x-rapidapi-key': get_secret("rapidapi_key"),
+        'x-rapidapi-host': "youtuber-success-estimator.p.rapidapi.com"
+    }
+    params = {'channelName': channel_name, 'channelType': 'youtube'}
+    response = http_client.get(f"{RAPIDAPI_URL}/api/v0/analytics/creators/estimator", headers=headers, params=params)
+    response_data = response.json()
+    channel_id = response_data['data']['channel']['id']
+    cache.put('channel_id', channel_name.lower(), channel_id)
+    return channel_id
+
+# Every `list` call used here (channels, playlistItems, videos) costs one YouTube Data API quota unit
+YOUTUBE_QUOTA_UNITS_PER_CALL = 1
+
+# Function to GET a YouTube Data API endpoint through the response cache.
+# Only successful responses are stored, so API errors are never replayed from disk.
+def youtube_get(kind, key, url):
+    return youtube_get_entry(kind, key, url)[0]
+
+# Function to GET a YouTube Data API endpoint through the response cache, along with the time the
+# response was fetched from the API (older than now when it comes from the cache).
+# Quota is drawn from `reservation` (see http_client.QuotaLedger.reserve) when given.
+def youtube_get_entry(kind, key, url, reservation=None):
+    with tracing.span(f'youtube.{kind}') as youtube_span:
+        return _youtube_get_entry(kind, key, url, reservation, youtube_span)
+
+def _youtube_get_entry(kind, key, url, reservation, youtube_span):
+    cache = get_cache()
+    entry = cache.get_entry(kind, key)
+    youtube_span.set(cache_hit=entry is not None)
+    if entry is None:
+        response = http_client.get(url, quota_units=YOUTUBE_QUOTA_UNITS_PER_CALL, quota_reservation=reservation)
+        entry = response.json(), time.time()
+        if response.status_code == 200:
+            cache.put(kind, key, entry[0])
+    return entry
+
+# Maximum number of `videos` batch lookups allowed in flight at once
+MAX_CONCURRENT_REQUESTS = 8
+
+# Raw columns collected from the `videos` endpoint, before typing
+RAW_VIDEO_COLUMNS = ['Video ID', 'Title', 'Duration', 'Views Count', 'Likes Count', 'Comments Count', 'Published Date', 'Thumbnail URL']
+
+# Function to fetch the details of one page (up to 50) of video IDs.
+# Returns a dict of raw column buffers in the order of `video_ids`; videos that no longer exist are simply missing.
+# `fetched_at` is when the statistics were fetched from the API.
+def fetch_video_page(video_ids, api_key, reservation=None):
+    videos_url = f'{YOUTUBE_API_URL}/videos?part=snippet,statistics,contentDetails&id={",".join(video_ids)}&key={api_key}'
+    videos_data, fetched_at = youtube_get_entry('videos', ','.join(video_ids), videos_url, reservation)
+
+    position = {video_id: i for i, video_id in enumerate(video_ids)}
+    items = sorted(videos_data['items'], key=lambda video: position.get(video['id'], len(position)))
+    return {
+        'Video ID': [video['id'] for video in items],
+        'Title': [video['snippet']['title'] for video in items],
+        'Duration': [video['contentDetails']['duration'] for video in items],
+        'Views Count': [video['statistics'].get('viewCount', '0') for video in items],
+        'Likes Count': [video['statistics'].get('likeCount', '0') for video in items],
+        'Comments Count': [video['statistics'].get('commentCount', '0') for video in items],
+        'Published Date': [video['snippet']['publishedAt'] for video in items],
+        'Thumbnail URL': [video['snippet']['thumbnails']['medium']['url'] for video in items],
+        'fetched_at': fetched_at,
+    }
+
+# Function to build the typed videos DataFrame from raw column buffers in one vectorized pass.
+# Durations become integer seconds, counts the smallest unsigned integer dtype that fits,
+# and publish dates timezone-aware timestamps.
+def build_videos_df(raw_columns):
+    with tracing.span('build_videos_df', rows=len(raw_columns['Video ID'])):
+        return _build_videos_df(raw_columns)
+
+def _build_videos_df(raw_columns):
+    videos_df = pd.DataFrame(raw_columns, columns=RAW_VIDEO_COLUMNS)
+
+    duration_parts = videos_df['Duration'].str.extract(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$').astype('float64').fillna(0)
+    videos_df['Duration'] = (duration_parts[0] * 86400 + duration_parts[1] * 3600 + duration_parts[2] * 60 + duration_parts[3]).astype('uint32')
+
+    for column in ('Views Count', 'Likes Count', 'Comments Count'):
+        videos_df[column] = pd.to_numeric(videos_df[column], downcast='unsigned')
+
+    videos_df['Published Date'] = pd.to_datetime(videos_df['Published Date'], utc=True, format='ISO8601')
+    videos_df['Video URL'] = 'https://www.youtube.com/watch?v=' + videos_df['Video ID']
+    return videos_df
+
+# Function to concatenate page buffers column by column into one set of raw columns.
+# A video seen twice (the playlist can shift while it is being paged) keeps its first occurrence.
+def concat_video_pages(pages):
+    seen = set()
+    keep = [video_id not in seen and not seen.add(video_id) for video_id in chain.from_iterable(page['Video ID'] for page in pages)]
+    return {column: list(compress(chain.from_iterable(page[column] for page in pages), keep)) for column in RAW_VIDEO_COLUMNS}
+
+# Function to concatenate typed videos DataFrames (see build_videos_df) into one, keeping the first
+# occurrence of a video seen twice. Lets a crawl type each page once, as it arrives.
+def concat_videos_dfs(videos_dfs):
+    # Empty frames are left out, so their default dtypes do not widen the count columns
+    non_empty = [videos_df for videos_df in videos_dfs if len(videos_df)]
+    return pd.concat(non_empty or videos_dfs, ignore_index=True).drop_duplicates('Video ID', ignore_index=True)
+
+# Function to get the channel details (snippet, statistics and uploads playlist)
+def get_channel_details(channel_id):
+    api_key = get_secret("youtube_api_key")
+    url = f'{YOUTUBE_API_URL}/channels?part=snippet,statistics,contentDetails&id={channel_id}&key={api_key}'
+    return youtube_get('channel', channel_id, url)
+
+# Function to stream the channel's uploads as raw page buffers, newest first, as soon as each page is ready.
+# Playlist pages are walked sequentially on a background thread (each page token depends on the previous
+# page), while the `videos` lookups for pages already seen run concurrently on a bounded thread pool.
+# In incremental mode the playlist is only paged until the first video of the last snapshot
+# is reached, and statistics of older videos are re-fetched only once the snapshot is stale.
+# The crawl snapshot is saved once the last page has been consumed.
+def iter_video_pages(channel_data, max_workers=MAX_CONCURRENT_REQUESTS, incremental=False):
+    api_key = get_secret("youtube_api_key")
+    channel_id = channel_data['items'][0]['id']
+    uploads_playlist_id = channel_data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+    state = load_crawl_state(channel_id) if incremental else None
+    old_ids = state['videos']['Video ID'] if state else []
+    known_ids = set(old_ids)
+
+    # Reserve the quota the crawl is expected to spend, so it is refused up front rather than running out
+    # part-way through, even with other crawls running at the same time
+    refresh_stats = bool(state) and stats_are_stale(state)
+    if state:
+        pages_needed = 2 + (math.ceil(len(old_ids) / 50) if refresh_stats else 0)
+    else:
+        pages_needed = 2 * math.ceil(int(channel_data['items'][0]['statistics']['videoCount']) / 50)
+    reservation = http_client.quota_ledger.reserve(pages_needed * YOUTUBE_QUOTA_UNITS_PER_CALL)
+
+    page_futures = queue.Queue()
+    stopped = threading.Event()
+
+    def page_playlist(executor):
+        try:
+            next_page_token = None
+            while not stopped.is_set():
+                playlist_url = f'{YOUTUBE_API_URL}/playlistItems?part=snippet,contentDetails&playlistId={uploads_playlist_id}&maxResults=50&key={api_key}'
+                if next_page_token:
+                    playlist_url += f'&pageToken={next_page_token}'
+                playlist_data, _ = youtube_get_entry('playlist', f'{uploads_playlist_id}:{next_page_token or ""}', playlist_url, reservation)
+
+                video_ids = []
+                reached_snapshot = False
+                for item in playlist_data['items']:
+                    video_id = item['contentDetails']['videoId']
+                    if video_id in known_ids:
+                        reached_snapshot = True
+                        break
+                    video_ids.append(video_id)
+                if video_ids:
+                    page_futures.put(executor.submit(tracing.propagate(fetch_video_page), video_ids, api_key, reservation))
+
+                next_page_token = playlist_data.get('nextPageToken')
+                if reached_snapshot or not next_page_token:
+                    break
+
+            if refresh_stats:
+                for i in range(0, len(old_ids), 50):
+                    page_futures.put(executor.submit(tracing.propagate(fetch_video_page), old_ids[i:i + 50], api_key, reservation))
+        finally:
+            page_futures.put(None)
+
+    pages = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor, ThreadPoolExecutor(max_workers=1) as pager:
+            paging = pager.submit(tracing.propagate(page_playlist), executor)
+            try:
+                # Pages are yielded in submission order, so the stream keeps playlist order
+                while True:
+                    future = page_futures.get()
+                    if future is None:
+                        break
+                    page = future.result()
+                    pages.append(page)
+                    yield page
+                paging.result()
+            finally:
+                stopped.set()
+    finally:
+        # Give back whatever the estimate held beyond what was spent
+        http_client.quota_ledger.release(reservation)
+
+    # The snapshot's statistics are as old as the oldest response they were read from
+    fetched_at = [page['fetched_at'] for page in pages]
+    if state and not refresh_stats:
+        fetched_at.append(state['stats_fetched_at'])
+        pages.append(state['videos'])
+        yield state['videos']
+
+    save_crawl_state(channel_id, concat_video_pages(pages), min(fetched_at, default=None))
+
+# Function to get the channel details and video data in one call, once the whole crawl has finished
+def get_channel_and_video_data(channel_id, max_workers=MAX_CONCURRENT_REQUESTS, incremental=False):
+    channel_data = get_channel_details(channel_id)
+    pages = list(iter_video_pages(channel_data, max_workers=max_workers, incremental=incremental))
+    return channel_data, build_videos_df(concat_video_pages(pages))
+
+# Function to pull the headline numbers out of a `channels` response
+def get_channel_overview(channel_data):
+    channel = channel_data['items'][0]
+    channel_created_on = None
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ'):
+        try:
+            channel_created_on = datetime.strptime(channel['snippet']['publishedAt'], fmt)
+            break
+        except ValueError:
+            pass
+
+    if channel_created_on is None:
+        raise ValueError(f'No valid date format found for {channel["snippet"]["publishedAt"]}')
+
+    return {
+        'channel_id': channel['id'],
+        'channel_title': channel['snippet']['title'],
+        'subscribers': int(channel['statistics']['subscriberCount']),
+        'total_views': int(channel['statistics']['viewCount']),
+        'video_count': int(channel['statistics']['videoCount']),
+        'channel_created_on': channel_created_on.strftime("%B %d, %Y"),
+    }